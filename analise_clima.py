@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Tabelas da página de impacto climático, calculadas de uma vez a partir dos chamados diários
+# por tipo e do clima diário. O clima entra por um único merge com os totais diários; faixa de
+# temperatura e dia chuvoso são classificados por dia (pd.cut) e levados às linhas de cada tipo
+# por posição, e as médias por tipo e faixa e o ranking de dias chuvosos saem de uma única
+# passada de np.bincount sobre os códigos. O dashboard guarda o resultado em cache por intervalo.
+
+# Limites superiores (inclusivos) de cada categoria de precipitação, em mm
+LIMITES_PRECIPITACAO = [0, 5, 25, np.inf]
+CATEGORIAS_PRECIPITACAO = ['Sem chuva', 'Chuva leve', 'Chuva moderada', 'Chuva forte']
+FAIXAS_TEMPERATURA = 5
+# Acima disso (em mm) o dia entra no ranking de tipos em dias chuvosos
+LIMITE_DIA_CHUVOSO = 10
+TOP_TIPOS_CHUVA = 5
+
+
+def categorizar_precipitacao(precipitacao):
+  return pd.cut(precipitacao, bins=[-np.inf, *LIMITES_PRECIPITACAO], labels=CATEGORIAS_PRECIPITACAO)
+
+
+# Faixas de mesma largura entre a menor e a maior temperatura do período
+def faixas_temperatura(temperatura, faixas=FAIXAS_TEMPERATURA):
+  if temperatura.isna().all():
+    return pd.Series(pd.Categorical([None] * len(temperatura), categories=pd.IntervalIndex([])), index=temperatura.index)
+  return pd.cut(temperatura, bins=faixas)
+
+
+# Recebe chamados com data, tipo e contagem_chamados e o clima com data, temperatura_media e
+# precipitacao. Devolve:
+# - diarios: total de chamados, temperatura, precipitação e categoria de precipitação por dia;
+# - media_por_categoria: média diária de chamados por categoria de precipitação;
+# - tipo_temperatura: média de chamados por tipo (linhas) e faixa de temperatura (colunas);
+# - top_tipos_chuva: tipos com mais chamados em dias com mais de LIMITE_DIA_CHUVOSO mm.
+def impacto(chamados, clima):
+  diarios = (chamados.groupby('data', as_index=False)['contagem_chamados'].sum()
+             .merge(clima[['data', 'temperatura_media', 'precipitacao']], on='data'))
+  diarios['categoria_precipitacao'] = categorizar_precipitacao(diarios['precipitacao'])
+  faixas = faixas_temperatura(diarios['temperatura_media'])
+
+  media_por_categoria = (diarios.groupby('categoria_precipitacao', as_index=False, observed=True)
+                         ['contagem_chamados'].mean())
+
+  # Dia (linha de diarios), tipo e faixa de temperatura de cada linha dos chamados, como códigos;
+  # dias sem clima (dia == -1) caem no valor acrescentado ao fim de cada vetor
+  dia = pd.Index(diarios['data']).get_indexer(chamados['data'])
+  tipo, tipos = pd.factorize(chamados['tipo'], sort=True)
+  faixa = np.append(faixas.cat.codes.to_numpy(), -1)[dia]
+  chuvoso = np.append(diarios['precipitacao'].to_numpy() > LIMITE_DIA_CHUVOSO, False)[dia]
+  contagem = chamados['contagem_chamados'].to_numpy(dtype='float64')
+
+  validas = (tipo >= 0) & (faixa >= 0)
+  n_faixas = len(faixas.cat.categories)
+  celula = tipo[validas] * n_faixas + faixa[validas]
+  tamanho = len(tipos) * n_faixas
+  soma = np.bincount(celula, weights=contagem[validas], minlength=tamanho).reshape(len(tipos), n_faixas)
+  linhas = np.bincount(celula, minlength=tamanho).reshape(len(tipos), n_faixas)
+  observadas = (linhas.any(axis=1), linhas.any(axis=0))
+  tipo_temperatura = pd.DataFrame(np.divide(soma, linhas, out=np.zeros(soma.shape), where=linhas > 0),
+                                  index=pd.Index(tipos, name='tipo'),
+                                  columns=faixas.cat.categories.astype(str)).loc[observadas]
+
+  chuvosas = (tipo >= 0) & chuvoso
+  soma_chuva = np.bincount(tipo[chuvosas], weights=contagem[chuvosas], minlength=len(tipos))
+  com_chuva = np.bincount(tipo[chuvosas], minlength=len(tipos)) > 0
+  top_tipos_chuva = (pd.Series(soma_chuva[com_chuva].astype('int64'), index=pd.Index(tipos[com_chuva], name='tipo'),
+                               name='contagem_chamados')
+                     .nlargest(TOP_TIPOS_CHUVA).reset_index())
+
+  return {
+    'diarios': diarios,
+    'media_por_categoria': media_por_categoria,
+    'tipo_temperatura': tipo_temperatura,
+    'top_tipos_chuva': top_tipos_chuva,
+  }
@@ -0,0 +1,59 @@
+import logging
+import os
+import threading
+import time
+
+import instrumentacao
+import paralelo
+
+# Aquecimento dos caches na partida do servidor: uma thread em segundo plano busca os intervalos
+# padrão de cada página (os mesmos argumentos que as páginas usam, para acertar as mesmas chaves
+# de cache) enquanto a primeira sessão é atendida. Roda uma vez por processo; as tarefas são
+# executadas em sequência para não disputar o BigQuery com as sessões, e as buscas iguais às de
+# uma sessão em andamento são coalescidas (ver coalescencia.py). As cargas em paralelo dentro das
+# tarefas rodam na própria thread do aquecimento (ver paralelo.executar_em_linha).
+
+logger = logging.getLogger(__name__)
+
+ATIVO = os.environ.get('AQUECIMENTO', '1') == '1'
+
+
+class Aquecimento:
+  def __init__(self, tarefas):
+    self.tarefas = tarefas
+    self.concluidas = []
+    self.erros = []
+    self.inicio = None
+    self.fim = None
+    self.thread = threading.Thread(target=self.executar, name='aquecimento', daemon=True)
+
+  def iniciar(self):
+    self.inicio = time.time()
+    self.thread.start()
+    return self
+
+  # tarefas: tuplas (nome, funcao, *args)
+  def executar(self):
+    paralelo.executar_em_linha()
+    for nome, funcao, *args in self.tarefas:
+      inicio = time.perf_counter()
+      try:
+        resultado = funcao(*args)
+      except Exception as erro:
+        logger.exception("Falha no aquecimento de %s", nome)
+        self.erros.append((nome, repr(erro)))
+        continue
+      segundos = time.perf_counter() - inicio
+      instrumentacao.registrar('aquecimento', nome, segundos, instrumentacao.tamanho(resultado))
+      self.concluidas.append((nome, segundos))
+    self.fim = time.time()
+    instrumentacao.marcar('aquecimento', self.fim - self.inicio)
+    logger.info("Aquecimento concluído em %.1fs: %d tarefas, %d falhas",
+                self.fim - self.inicio, len(self.concluidas), len(self.erros))
+
+  def concluido(self):
+    return self.fim is not None
+
+
+def iniciar(tarefas):
+  return Aquecimento(tarefas).iniciar()
@@ -0,0 +1,156 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import consultas
+
+# Armazém local de agregados diários dos chamados do 1746.
+# Cada dia fica em um arquivo Parquet próprio (dia x tipo x status x hora x bairro),
+# de forma que apenas os dias ainda não armazenados precisam ser buscados no BigQuery.
+
+DIRETORIO_DADOS = os.environ.get('DASHBOARD_DADOS', '.dados')
+DIRETORIO_ARMAZEM = os.path.join(DIRETORIO_DADOS, 'chamados_diarios')
+# Dias por consulta de agregados: agregados acima do limite de linhas são recusados, não amostrados
+# (ver fonte_bigquery.ler_em_lotes), então lacunas longas são buscadas em blocos
+MAX_DIAS_POR_CONSULTA = 31
+
+ESQUEMA_AGREGADO = pa.schema([
+  ('data', pa.date32()),
+  ('tipo', pa.string()),
+  ('status', pa.string()),
+  ('hora', pa.int8()),
+  ('id_bairro', pa.string()),
+  ('contagem', pa.int64()),
+])
+
+def para_data(valor):
+  if isinstance(valor, datetime):
+    return valor.date()
+  if isinstance(valor, date):
+    return valor
+  return pd.Timestamp(valor).date()
+
+
+def caminho_dia(dia):
+  return os.path.join(DIRETORIO_ARMAZEM, f"{dia.isoformat()}.parquet")
+
+
+def dias_do_intervalo(data_inicio, data_fim):
+  inicio, fim = para_data(data_inicio), para_data(data_fim)
+  return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+
+def dias_faltantes(data_inicio, data_fim):
+  return [dia for dia in dias_do_intervalo(data_inicio, data_fim) if not os.path.exists(caminho_dia(dia))]
+
+
+# Agrupa dias em intervalos contíguos [inicio, fim] para buscar cada lacuna com uma única query
+def agrupar_intervalos(dias):
+  intervalos = []
+  for dia in sorted(dias):
+    if intervalos and dia - intervalos[-1][1] == timedelta(days=1):
+      intervalos[-1][1] = dia
+    else:
+      intervalos.append([dia, dia])
+  return [tuple(intervalo) for intervalo in intervalos]
+
+
+# Divide cada intervalo [inicio, fim] em blocos de até max_dias dias
+def dividir_intervalos(intervalos, max_dias):
+  blocos = []
+  for inicio, fim in intervalos:
+    while inicio <= fim:
+      fim_bloco = min(fim, inicio + timedelta(days=max_dias - 1))
+      blocos.append((inicio, fim_bloco))
+      inicio = fim_bloco + timedelta(days=1)
+  return blocos
+
+
+def normalizar_agregado(df):
+  df = df.copy()
+  df['data'] = pd.to_datetime(df['data']).dt.date
+  df['tipo'] = df['tipo'].astype('string')
+  df['status'] = df['status'].astype('string')
+  df['hora'] = df['hora'].astype('int8')
+  df['id_bairro'] = df['id_bairro'].astype('string')
+  df['contagem'] = df['contagem'].astype('int64')
+  return df[ESQUEMA_AGREGADO.names]
+
+
+def salvar_dia(dia, df):
+  os.makedirs(DIRETORIO_ARMAZEM, exist_ok=True)
+  tabela = pa.Table.from_pandas(df, schema=ESQUEMA_AGREGADO, preserve_index=False)
+  # Escrita atômica: vários processos e threads do Streamlit podem preencher o mesmo dia
+  temporario = f"{caminho_dia(dia)}.{os.getpid()}.{threading.get_ident()}.tmp"
+  pq.write_table(tabela, temporario)
+  os.replace(temporario, caminho_dia(dia))
+
+
+# Resultados amostrados ou cortados pelo limite de linhas (ver fonte_bigquery.py) não podem ser
+# gravados como se fossem o dia inteiro
+def resultado_completo(df):
+  return not df.attrs.get('limitado', False) and df.attrs.get('fracao_amostra', 1.0) >= 1.0
+
+
+# Marca em df a menor fração de amostra e o limite dos resultados que o formaram, para a página avisar
+def herdar_amostra(df, origens):
+  df.attrs['fracao_amostra'] = min((origem.get('fracao_amostra', 1.0) for origem in origens), default=1.0)
+  df.attrs['limitado'] = any(origem.get('limitado', False) for origem in origens)
+  return df
+
+
+# Busca no BigQuery os dias ausentes do armazém e grava um arquivo por dia.
+# O dia corrente ainda recebe chamados, então é consultado mas nunca persistido.
+def sincronizar(data_inicio, data_fim, executar_query):
+  hoje = date.today()
+  recentes = []
+  for inicio, fim in dividir_intervalos(agrupar_intervalos(dias_faltantes(data_inicio, data_fim)), MAX_DIAS_POR_CONSULTA):
+    df = executar_query(*consultas.agregado_diario(inicio, fim))
+    completo = resultado_completo(df)
+    df = normalizar_agregado(df)
+    por_dia = dict(tuple(df.groupby('data')))
+    for dia in dias_do_intervalo(inicio, fim):
+      df_dia = por_dia.get(dia, df.iloc[0:0])
+      if dia >= hoje or not completo:
+        recentes.append(df_dia)
+      else:
+        salvar_dia(dia, df_dia)
+  return recentes
+
+
+def descartar_dias(dias):
+  for dia in dias:
+    if os.path.exists(caminho_dia(dia)):
+      os.remove(caminho_dia(dia))
+
+
+# Total de chamados por dia já armazenado (dias sem arquivo ficam de fora)
+def totais_diarios(data_inicio, data_fim):
+  arquivos = [caminho_dia(dia) for dia in dias_do_intervalo(data_inicio, data_fim) if os.path.exists(caminho_dia(dia))]
+  dias = [date.fromisoformat(os.path.basename(arquivo)[:10]) for arquivo in arquivos]
+  totais = pd.Series(0, index=pd.to_datetime(dias), dtype='int64')
+  if arquivos:
+    df = pq.read_table(arquivos, schema=ESQUEMA_AGREGADO, columns=['data', 'contagem']).to_pandas()
+    totais = totais.add(df.groupby(pd.to_datetime(df['data']))['contagem'].sum(), fill_value=0).astype('int64')
+  return totais.rename_axis('data').rename('contagem').reset_index()
+
+
+# Se todos os dias do intervalo estão gravados no armazém (dias amostrados, cortados ou de hoje não são)
+def dias_armazenados(data_inicio, data_fim):
+  return all(os.path.exists(caminho_dia(dia)) for dia in dias_do_intervalo(data_inicio, data_fim))
+
+
+def carregar_agregado(data_inicio, data_fim, executar_query):
+  recentes = sincronizar(data_inicio, data_fim, executar_query)
+  arquivos = [caminho_dia(dia) for dia in dias_do_intervalo(data_inicio, data_fim) if os.path.exists(caminho_dia(dia))]
+  partes = [pq.read_table(arquivos, schema=ESQUEMA_AGREGADO).to_pandas()] if arquivos else []
+  partes += recentes
+  if not partes:
+    return pd.DataFrame(columns=ESQUEMA_AGREGADO.names)
+  df = pd.concat(partes, ignore_index=True)
+  df['data'] = pd.to_datetime(df['data'])
+  return df
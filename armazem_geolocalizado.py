@@ -0,0 +1,88 @@
+import os
+import threading
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import consultas
+from armazem import (DIRETORIO_DADOS, MAX_DIAS_POR_CONSULTA, agrupar_intervalos, dias_do_intervalo, dividir_intervalos,
+                     herdar_amostra, resultado_completo)
+
+# Armazém local dos chamados geolocalizados, particionado por bairro.
+# Cada dia é buscado uma única vez para a cidade inteira e gravado em um Parquet com um
+# row group por bairro; a leitura de um bairro filtra pelo `id_bairro` e só descomprime o
+# row group dele, então trocar de bairro na página não consulta o BigQuery.
+
+DIRETORIO_GEOLOCALIZADOS = os.path.join(DIRETORIO_DADOS, 'chamados_geolocalizados')
+
+ESQUEMA_GEOLOCALIZADO = pa.schema([
+  ('id_bairro', pa.string()),
+  ('tipo', pa.string()),
+  ('status', pa.string()),
+  ('latitude', pa.float64()),
+  ('longitude', pa.float64()),
+  ('data_inicio', pa.timestamp('us')),
+])
+
+
+def caminho_dia(dia):
+  return os.path.join(DIRETORIO_GEOLOCALIZADOS, f"{dia.isoformat()}.parquet")
+
+
+def dias_faltantes(data_inicio, data_fim):
+  return [dia for dia in dias_do_intervalo(data_inicio, data_fim) if not os.path.exists(caminho_dia(dia))]
+
+
+def normalizar(df):
+  df = df.copy()
+  for coluna in ['id_bairro', 'tipo', 'status']:
+    df[coluna] = df[coluna].astype('string')
+  df['latitude'] = df['latitude'].astype('float64')
+  df['longitude'] = df['longitude'].astype('float64')
+  df['data_inicio'] = pd.to_datetime(df['data_inicio'])
+  return df[ESQUEMA_GEOLOCALIZADO.names]
+
+
+def salvar_dia(dia, df):
+  os.makedirs(DIRETORIO_GEOLOCALIZADOS, exist_ok=True)
+  temporario = f"{caminho_dia(dia)}.{os.getpid()}.{threading.get_ident()}.tmp"
+  with pq.ParquetWriter(temporario, ESQUEMA_GEOLOCALIZADO) as escritor:
+    for _, df_bairro in df.groupby('id_bairro', dropna=False, sort=True):
+      escritor.write_table(pa.Table.from_pandas(df_bairro, schema=ESQUEMA_GEOLOCALIZADO, preserve_index=False))
+  os.replace(temporario, caminho_dia(dia))
+
+
+# Mesma política do armazem.sincronizar: lacunas contíguas buscadas em blocos de até
+# MAX_DIAS_POR_CONSULTA dias, cada bloco gravado assim que chega, dia corrente nunca gravado.
+# Devolve também os attrs dos resultados amostrados ou cortados, que não foram gravados
+def sincronizar(data_inicio, data_fim, executar_query):
+  hoje = date.today()
+  recentes, amostras = [], []
+  for inicio, fim in dividir_intervalos(agrupar_intervalos(dias_faltantes(data_inicio, data_fim)), MAX_DIAS_POR_CONSULTA):
+    df = executar_query(*consultas.chamados_geolocalizados(inicio, fim))
+    completo = resultado_completo(df)
+    if not completo:
+      amostras.append(dict(df.attrs))
+    df = normalizar(df)
+    por_dia = dict(tuple(df.groupby(df['data_inicio'].dt.date)))
+    for dia in dias_do_intervalo(inicio, fim):
+      df_dia = por_dia.get(dia, df.iloc[0:0])
+      if dia >= hoje or not completo:
+        recentes.append(df_dia)
+      else:
+        salvar_dia(dia, df_dia)
+  return recentes, amostras
+
+
+# Chamados geolocalizados do intervalo, de todos os bairros ou apenas de `id_bairro`
+def carregar(data_inicio, data_fim, executar_query, id_bairro=None):
+  recentes, amostras = sincronizar(data_inicio, data_fim, executar_query)
+  arquivos = [caminho_dia(dia) for dia in dias_do_intervalo(data_inicio, data_fim) if os.path.exists(caminho_dia(dia))]
+  filtro = None if id_bairro is None else [('id_bairro', '=', str(id_bairro))]
+  partes = [pq.read_table(arquivos, schema=ESQUEMA_GEOLOCALIZADO, filters=filtro).to_pandas()] if arquivos else []
+  partes += [df if id_bairro is None else df[df['id_bairro'] == str(id_bairro)] for df in recentes]
+  if not partes:
+    return pd.DataFrame(columns=ESQUEMA_GEOLOCALIZADO.names)
+  return herdar_amostra(pd.concat(partes, ignore_index=True), amostras)
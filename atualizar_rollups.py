@@ -0,0 +1,34 @@
+import argparse
+import os
+from datetime import date
+
+from dotenv import load_dotenv
+
+# Antes dos módulos do projeto, que leem suas configurações do ambiente ao serem importados
+load_dotenv()
+
+import fonte_bigquery
+import rollups
+from compactacao import compactar
+
+# Refresh incremental dos rollups do dashboard, para rodar agendado (cron) fora do Streamlit.
+# Sem argumentos, reconfere os dias desde a marca d'água menos a janela de atraso.
+#
+# Uso:
+#   python atualizar_rollups.py
+#   python atualizar_rollups.py --desde 2023-01-01
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Atualiza os rollups pré-materializados do dashboard.')
+  parser.add_argument('--desde', type=date.fromisoformat, help='primeiro dia a reconferir (AAAA-MM-DD)')
+  parser.add_argument('--janela-atraso', type=int, default=rollups.JANELA_ATRASO,
+                      help="dias antes da marca d'água reconferidos em busca de chamados atrasados")
+  argumentos = parser.parse_args()
+
+  projeto = os.environ['billing_project_id']
+  afetados = rollups.atualizar(lambda sql, parametros=(): compactar(fonte_bigquery.executar(sql, projeto, parametros)),
+                               argumentos.desde, argumentos.janela_atraso)
+  print(f"{len(afetados)} dia(s) reconstruído(s)")
+  for dia in afetados:
+    print(f"  {dia.isoformat()}")
+  print(f"Marca d'água: {rollups.ler_marca()['data_inicio_max']}")
@@ -0,0 +1,37 @@
+# Dimensão de bairros (nome, subprefeitura e geometria em WKT) indexada por id e por nome,
+# carregada uma vez e consultada em O(1) pelas páginas.
+
+
+class IndiceBairros:
+  def __init__(self, df):
+    df = df.astype({'id_bairro': 'string', 'nome': 'string', 'subprefeitura': 'string'})
+    self.tabela = df.set_index('id_bairro').sort_values('nome')
+    self.id_por_nome = dict(zip(self.tabela['nome'], self.tabela.index))
+    self.nome_por_id = self.tabela['nome'].to_dict()
+    self.subprefeitura_por_id = self.tabela['subprefeitura'].to_dict()
+
+  def nomes(self):
+    return list(self.id_por_nome)
+
+  def id_bairro(self, nome):
+    return self.id_por_nome[nome]
+
+  def subprefeitura(self, id_bairro):
+    return self.subprefeitura_por_id.get(str(id_bairro))
+
+  def geometria(self, id_bairro):
+    return self.tabela['geometria'].get(str(id_bairro))
+
+  # Acrescenta nome e subprefeitura a uma tabela com `id_bairro`; chamados sem bairro ficam como
+  # "Sem bairro" (ver a pergunta 5 de analise_sql.sql)
+  def anexar(self, df):
+    ids = df['id_bairro'].astype('string')
+    return df.assign(nome=ids.map(self.nome_por_id).fillna('Sem bairro'),
+                     subprefeitura=ids.map(self.subprefeitura_por_id).fillna('Sem bairro'))
+
+
+# Ranking de bairros e totais por subprefeitura a partir de contagens por `id_bairro`
+def ranking(contagens, indice, coluna, n=None):
+  totais = indice.anexar(contagens).groupby(coluna, as_index=False)['contagem'].sum()
+  totais = totais.sort_values('contagem', ascending=False, ignore_index=True)
+  return totais.head(n) if n else totais
@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Benchmark das páginas do dashboard e dos caminhos de dados dos get_*, sem BigQuery nem internet.
+# O BigQuery é substituído por um ClienteLocal (bigquery_local.py) que responde cada modelo de
+# consultas.py a partir de uma tabela sintética de chamados com N linhas; Open-Meteo e feriados
+# vêm do servidor_fixtures.py. Cada alvo roda em um subprocesso próprio, com armazém local vazio,
+# e mede o tempo da primeira execução (fria) e da repetição (quente), o pico de RSS e o tamanho
+# do que é enviado ao navegador (JSON dos gráficos) ou mantido em memória (fontes).
+#
+# Uso:
+#   python benchmark.py --escala 100000 --escala 1000000
+#   python benchmark.py --escala 100000 --gravar-baseline
+#   python benchmark.py --alvo "Mapa Geral de Chamados" --escala 10000000
+
+ARQUIVO_DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard_1746.py')
+ARQUIVO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+PROJETO = 'benchmark'
+INICIO_SINTETICO = date(2020, 1, 1)
+
+PAGINAS = ["Visão Geral dos Chamados", "Análise por Bairro", "Mapa Geral de Chamados", "Tendências Temporais",
+           "Impacto Climático", "Impacto de Eventos", "Impacto de Feriados nos Chamados"]
+FONTES = ['fonte:agregado', 'fonte:rollup_dia_tipo_status', 'fonte:rollup_dia_hora', 'fonte:rollup_dia_bairro',
+          'fonte:geolocalizado', 'fonte:bairros', 'fonte:clima', 'fonte:feriados']
+
+METRICAS = ['tempo_frio_s', 'tempo_quente_s', 'pico_rss_mb', 'payload_bytes']
+# Folga absoluta somada à tolerância relativa, para que ruído em medidas pequenas não reprove
+FOLGAS = {'tempo_frio_s': 0.1, 'tempo_quente_s': 0.05, 'pico_rss_mb': 10, 'payload_bytes': 0}
+
+TIPOS = ['Estacionamento irregular', 'Iluminação pública', 'Remoção de entulho', 'Poda de árvore',
+         'Buraco na pista', 'Perturbação do sossego', 'Limpeza de logradouro', 'Fiscalização de obras',
+         'Vazamento de água', 'Ônibus', 'Sinalização de trânsito', 'Drenagem e saneamento']
+STATUS = ['FECHADO', 'ABERTO', 'EM ANDAMENTO']
+SUBPREFEITURAS = ['Centro', 'Zona Sul', 'Zona Norte', 'Tijuca', 'Barra da Tijuca', 'Jacarepaguá',
+                  'Grande Bangu', 'Campo Grande']
+NUMERO_BAIRROS = 164
+
+
+# Tabela sintética de chamados, ordenada por `data_inicio` para filtrar intervalos com searchsorted
+def gerar_chamados(linhas, inicio=INICIO_SINTETICO, semente=0):
+  rng = np.random.default_rng(semente)
+  segundos = int((datetime.now() - datetime.combine(inicio, datetime.min.time())).total_seconds())
+  data_inicio = np.sort(np.datetime64(inicio, 's') + rng.integers(0, segundos, linhas).astype('timedelta64[s]'))
+  pesos_tipo = 1 / np.arange(1, len(TIPOS) + 1)
+  bairro = rng.integers(0, NUMERO_BAIRROS + 1, linhas)
+  centros = gerar_centros(semente)
+  sem_bairro = bairro == NUMERO_BAIRROS
+  latitude = centros[np.minimum(bairro, NUMERO_BAIRROS - 1), 0] + rng.normal(0, 0.006, linhas)
+  longitude = centros[np.minimum(bairro, NUMERO_BAIRROS - 1), 1] + rng.normal(0, 0.006, linhas)
+  latitude[sem_bairro] = np.nan
+  longitude[sem_bairro] = np.nan
+  return pd.DataFrame({
+    'data_inicio': pd.to_datetime(data_inicio),
+    'tipo': pd.Categorical.from_codes(rng.choice(len(TIPOS), linhas, p=pesos_tipo / pesos_tipo.sum()), TIPOS),
+    'status': pd.Categorical.from_codes(rng.choice(len(STATUS), linhas, p=[0.7, 0.2, 0.1]), STATUS),
+    'id_bairro': pd.Series([str(i + 1) for i in range(NUMERO_BAIRROS)] + [None], dtype='string')[bairro].to_numpy(),
+    'latitude': latitude,
+    'longitude': longitude,
+  })
+
+
+def gerar_centros(semente=0):
+  rng = np.random.default_rng(semente + 1)
+  return np.column_stack([rng.uniform(-23.05, -22.80, NUMERO_BAIRROS), rng.uniform(-43.70, -43.15, NUMERO_BAIRROS)])
+
+
+def gerar_bairros():
+  centros = gerar_centros()
+  geometrias = [f"POLYGON(({lon - 0.01} {lat - 0.01}, {lon + 0.01} {lat - 0.01}, {lon + 0.01} {lat + 0.01}, "
+                f"{lon - 0.01} {lat + 0.01}, {lon - 0.01} {lat - 0.01}))" for lat, lon in centros]
+  return pd.DataFrame({
+    'id_bairro': [str(i + 1) for i in range(NUMERO_BAIRROS)],
+    'nome': [f"Bairro {i + 1:03d}" for i in range(NUMERO_BAIRROS)],
+    'subprefeitura': [SUBPREFEITURAS[i % len(SUBPREFEITURAS)] for i in range(NUMERO_BAIRROS)],
+    'geometria': geometrias,
+  })
+
+
+def gerar_eventos(inicio=INICIO_SINTETICO):
+  from servidor_fixtures import pascoa
+  linhas = []
+  for ano in range(inicio.year, date.today().year + 1):
+    carnaval = pascoa(ano) - timedelta(days=47)
+    linhas += [('Reveillon', date(ano, 12, 30), date(ano, 12, 31), 0.95),
+               ('Carnaval', carnaval - timedelta(days=4), carnaval + timedelta(days=1), 0.9),
+               ('Rock in Rio', date(ano, 9, 13), date(ano, 9, 22), 0.8)]
+  return pd.DataFrame(linhas, columns=['evento', 'data_inicial', 'data_final', 'taxa_ocupacao'])
+
+
+# Resolve cada modelo de consultas.py sobre a tabela sintética, como o BigQuery faria
+class ResolvedorSintetico:
+  def __init__(self, chamados):
+    import consultas
+    self.consultas = consultas
+    self.chamados = chamados
+    self.instantes = chamados['data_inicio'].to_numpy()
+
+  def intervalo(self, parametros):
+    inicio = np.searchsorted(self.instantes, np.datetime64(parametros['inicio']), 'left')
+    fim = np.searchsorted(self.instantes, np.datetime64(parametros['fim']), 'left')
+    return self.chamados.iloc[inicio:fim]
+
+  def __call__(self, sql, parametros):
+    c = self.consultas
+    amostra = re.search(r' TABLESAMPLE SYSTEM \(([\d.]+) PERCENT\)', sql)
+    modelo = sql.replace(amostra.group(0), '') if amostra else sql
+    if modelo == c.SQL_BAIRROS:
+      return gerar_bairros()
+    if modelo == c.SQL_EVENTOS:
+      return gerar_eventos()
+
+    df = self.intervalo(parametros)
+    if 'id_bairro' in parametros:
+      df = df[df['id_bairro'] == parametros['id_bairro']]
+    if amostra:
+      df = df.sample(frac=float(amostra.group(1)) / 100, random_state=0)
+    data = df['data_inicio'].dt.date
+
+    if modelo == c.SQL_AGREGADO_DIARIO:
+      return (df.assign(data=data, hora=df['data_inicio'].dt.hour)
+              .groupby(['data', 'tipo', 'status', 'hora', 'id_bairro'], observed=True, dropna=False)
+              .size().rename('contagem').reset_index())
+    if modelo == c.SQL_CONTAGEM_DIARIA:
+      return df.groupby(data).agg(contagem=('data_inicio', 'size'), ultimo_inicio=('data_inicio', 'max')).rename_axis('data').reset_index()
+    if modelo == c.SQL_GRADE:
+      import mapa
+      df = df.dropna(subset=['latitude', 'longitude'])
+      return (df.assign(data=df['data_inicio'].dt.date, latitude=mapa.centro_celula(df['latitude']),
+                        longitude=mapa.centro_celula(df['longitude']))
+              .groupby(['data', 'latitude', 'longitude', 'tipo', 'status'], observed=True)
+              .size().rename('contagem').reset_index())
+    if modelo in (c.SQL_GEOLOCALIZADOS, c.SQL_GEOLOCALIZADOS_BAIRRO):
+      return df.dropna(subset=['latitude', 'longitude'])[['id_bairro', 'tipo', 'status', 'latitude', 'longitude', 'data_inicio']]
+    raise ValueError(f"Consulta sem resolvedor sintético:\n{sql}")
+
+
+def pico_rss_mb():
+  pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Linux informa em KB e macOS em bytes
+  return pico / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+# Prepara o ambiente de um subprocesso: armazém vazio, fixtures HTTP e BigQuery sintético
+def preparar(escala):
+  os.environ['DASHBOARD_DADOS'] = tempfile.mkdtemp(prefix='benchmark_')
+  os.environ['billing_project_id'] = PROJETO
+  # O aquecimento em segundo plano buscaria as outras páginas durante a medição
+  os.environ['AQUECIMENTO'] = '0'
+  import servidor_fixtures
+  servidor = servidor_fixtures.iniciar(0, diretorio=servidor_fixtures.DIRETORIO_FIXTURES)
+  os.environ['OPEN_METEO_URL'] = f"http://127.0.0.1:{servidor.server_port}/v1/archive"
+  os.environ['NAGER_URL'] = f"http://127.0.0.1:{servidor.server_port}/api/v3/PublicHolidays"
+
+  import fonte_bigquery
+  from bigquery_local import ClienteLocal
+  fonte_bigquery._clientes[PROJETO] = ClienteLocal(ResolvedorSintetico(gerar_chamados(escala)))
+
+
+def executar_query(sql, parametros=()):
+  import fonte_bigquery
+  from compactacao import compactar
+  return compactar(fonte_bigquery.executar(sql, PROJETO, parametros))
+
+
+def carregar_fonte(alvo):
+  import armazem, armazem_geolocalizado, bairros, clima, consultas, feriados, rollups
+  hoje = date.today()
+  if alvo == 'fonte:agregado':
+    return armazem.carregar_agregado(hoje - timedelta(days=180), hoje, executar_query)
+  if alvo.startswith('fonte:rollup_'):
+    return rollups.carregar(alvo.removeprefix('fonte:rollup_'), hoje - timedelta(days=180), hoje, executar_query)
+  if alvo == 'fonte:geolocalizado':
+    return armazem_geolocalizado.carregar(hoje - timedelta(days=30), hoje, executar_query)
+  if alvo == 'fonte:bairros':
+    return bairros.IndiceBairros(executar_query(*consultas.bairros())).tabela
+  if alvo == 'fonte:clima':
+    return clima.carregar(hoje - timedelta(days=365), hoje)
+  if alvo == 'fonte:feriados':
+    return feriados.carregar()
+  raise ValueError(f"Alvo desconhecido: {alvo}")
+
+
+def medir_fonte(alvo):
+  from compactacao import memoria
+  inicio = time.perf_counter()
+  carregar_fonte(alvo)
+  frio = time.perf_counter() - inicio
+  inicio = time.perf_counter()
+  df = carregar_fonte(alvo)
+  quente = time.perf_counter() - inicio
+  return {'tempo_frio_s': frio, 'tempo_quente_s': quente, 'payload_bytes': memoria(df)}
+
+
+def medir_pagina(pagina):
+  from streamlit.testing.v1 import AppTest
+  app = AppTest.from_file(ARQUIVO_DASHBOARD, default_timeout=3600)
+  app.session_state['pagina'] = pagina
+  inicio = time.perf_counter()
+  app.run()
+  frio = time.perf_counter() - inicio
+  inicio = time.perf_counter()
+  app.run()
+  quente = time.perf_counter() - inicio
+  if app.exception:
+    raise RuntimeError(f"{pagina}: {app.exception[0].value}")
+  graficos = app.get('plotly_chart')
+  return {'tempo_frio_s': frio, 'tempo_quente_s': quente,
+          'payload_bytes': sum(len(grafico.proto.spec) for grafico in graficos), 'graficos': len(graficos)}
+
+
+# Executado no subprocesso: mede um alvo e imprime o resultado como JSON na última linha
+def medir(alvo, escala):
+  preparar(escala)
+  rss_inicial = pico_rss_mb()
+  resultado = medir_fonte(alvo) if alvo.startswith('fonte:') else medir_pagina(alvo)
+  resultado['pico_rss_mb'] = pico_rss_mb()
+  resultado['acrescimo_rss_mb'] = resultado['pico_rss_mb'] - rss_inicial
+  print(json.dumps(resultado))
+
+
+def medir_em_subprocesso(alvo, escala):
+  processo = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', alvo, '--escala', str(escala)],
+                            capture_output=True, text=True, cwd=os.path.dirname(ARQUIVO_DASHBOARD))
+  if processo.returncode != 0:
+    raise RuntimeError(f"{alvo} ({escala}): {processo.stderr.strip().splitlines()[-1]}")
+  return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+# Alvos sem entrada na baseline também reprovam: sem referência, o alvo não estaria sendo verificado
+def regressoes(resultados, baseline, tolerancia):
+  encontradas = []
+  for escala, alvos in resultados.items():
+    for alvo, metricas in alvos.items():
+      referencia = baseline.get(escala, {}).get(alvo)
+      if referencia is None:
+        encontradas.append(f"{alvo} ({escala}): sem baseline (grave com --gravar-baseline)")
+        continue
+      for metrica in METRICAS:
+        limite = referencia[metrica] * (1 + tolerancia) + FOLGAS[metrica]
+        if metricas[metrica] > limite:
+          encontradas.append(f"{alvo} ({escala}): {metrica} {metricas[metrica]:.2f} > {limite:.2f} "
+                             f"(baseline {referencia[metrica]:.2f})")
+  return encontradas
+
+
+def imprimir(escala, alvo, metricas):
+  print(f"{escala:>10} {alvo:<36} {metricas['tempo_frio_s']:>9.2f} {metricas['tempo_quente_s']:>9.2f} "
+        f"{metricas['pico_rss_mb']:>9.0f} {metricas['payload_bytes'] / 1024:>11.0f}")
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Benchmark das páginas e fontes de dados do dashboard.')
+  parser.add_argument('--escala', type=int, action='append', help='linhas da tabela sintética de chamados (repetível)')
+  parser.add_argument('--alvo', action='append', choices=PAGINAS + FONTES, help='página ou fonte a medir (repetível)')
+  parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+  parser.add_argument('--gravar-baseline', action='store_true', help='grava os resultados como nova baseline')
+  parser.add_argument('--tolerancia', type=float, default=0.25, help='piora relativa aceita antes de falhar')
+  parser.add_argument('--saida', help='arquivo JSON para os resultados')
+  parser.add_argument('--medir', help=argparse.SUPPRESS)
+  argumentos = parser.parse_args()
+  escalas = argumentos.escala or [100_000]
+
+  if argumentos.medir:
+    medir(argumentos.medir, escalas[0])
+    sys.exit(0)
+
+  baseline = {}
+  if os.path.exists(argumentos.baseline):
+    with open(argumentos.baseline, encoding='utf-8') as arquivo:
+      baseline = json.load(arquivo)
+  elif not argumentos.gravar_baseline:
+    print(f"ERRO baseline {argumentos.baseline} não encontrada (grave com --gravar-baseline)")
+    sys.exit(1)
+
+  resultados = {}
+  print(f"{'escala':>10} {'alvo':<36} {'frio (s)':>9} {'quente (s)':>9} {'RSS (MB)':>9} {'payload (KB)':>11}")
+  for escala in escalas:
+    for alvo in argumentos.alvo or PAGINAS + FONTES:
+      metricas = medir_em_subprocesso(alvo, escala)
+      resultados.setdefault(str(escala), {})[alvo] = metricas
+      imprimir(escala, alvo, metricas)
+
+  if argumentos.saida:
+    with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+      json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+  if argumentos.gravar_baseline:
+    for escala, alvos in resultados.items():
+      baseline.setdefault(escala, {}).update(alvos)
+    os.makedirs(os.path.dirname(argumentos.baseline), exist_ok=True)
+    with open(argumentos.baseline, 'w', encoding='utf-8') as arquivo:
+      json.dump(baseline, arquivo, indent=2, ensure_ascii=False)
+    print(f"Baseline gravada em {argumentos.baseline}")
+  else:
+    encontradas = regressoes(resultados, baseline, argumentos.tolerancia)
+    for regressao in encontradas:
+      print(f"REGRESSÃO {regressao}")
+    sys.exit(1 if encontradas else 0)
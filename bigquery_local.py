@@ -0,0 +1,99 @@
+import re
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pandas as pd
+
+# Substituto local do cliente do BigQuery (ativado com BIGQUERY_LOCAL=1).
+# Estima os bytes que cada consulta processaria a partir de um catálogo com o volume e a largura
+# das colunas de cada tabela, considerando apenas as colunas citadas e as partições mensais
+# alcançadas pelo intervalo. Sem `resolver`, atende só a dry-runs; com um `resolver(sql, parametros)`
+# que devolve DataFrames, também executa as consultas.
+
+CATALOGO = {
+  'datario.adm_central_atendimento_1746.chamado': {
+    'linhas_por_particao': 180_000,
+    'particao': 'data_particao',
+    'primeira_particao': date(2016, 1, 1),
+    'bytes_por_coluna': {
+      'id_chamado': 10, 'data_inicio': 8, 'data_fim': 8, 'id_bairro': 6, 'id_territorialidade': 6,
+      'tipo': 28, 'subtipo': 32, 'status': 12, 'latitude': 18, 'longitude': 18,
+      'id_unidade_organizacional': 6, 'nome_unidade_organizacional': 60, 'categoria': 10,
+      'id_tipo': 6, 'id_subtipo': 6, 'data_particao': 8,
+    },
+  },
+  'datario.dados_mestres.bairro': {
+    'linhas': 164,
+    'bytes_por_coluna': {'id_bairro': 6, 'nome': 18, 'subprefeitura': 18, 'area': 8, 'perimetro': 8, 'geometria': 40_000},
+  },
+  'datario.turismo_fluxo_visitantes.rede_hoteleira_ocupacao_eventos': {
+    'linhas': 6,
+    'bytes_por_coluna': {'ano': 8, 'data_inicial': 8, 'data_final': 8, 'evento': 12, 'taxa_ocupacao': 8},
+  },
+}
+
+
+def meses_entre(inicio, fim):
+  return max((fim.year - inicio.year) * 12 + fim.month - inicio.month + 1, 0)
+
+
+def estimar_bytes(sql, parametros):
+  total = 0
+  for tabela, info in CATALOGO.items():
+    if f'`{tabela}`' not in sql:
+      continue
+    colunas = info['bytes_por_coluna']
+    citadas = [coluna for coluna in colunas if re.search(rf'\b{coluna}\b', sql)]
+    if re.search(r'SELECT\s+(\w+\.)?\*', sql):
+      citadas = list(colunas)
+    largura = sum(colunas[coluna] for coluna in citadas)
+
+    if 'particao' not in info:
+      linhas = info['linhas']
+    elif info['particao'] in sql and 'inicio' in parametros and 'fim' in parametros:
+      linhas = info['linhas_por_particao'] * meses_entre(parametros['inicio'].date(), parametros['fim'].date())
+    else:
+      linhas = info['linhas_por_particao'] * meses_entre(info['primeira_particao'], date.today())
+
+    amostra = re.search(r'TABLESAMPLE SYSTEM \(([\d.]+) PERCENT\)', sql)
+    if amostra:
+      linhas *= float(amostra.group(1)) / 100
+    total += int(linhas * largura)
+  return total
+
+
+class ResultadoLocal:
+  def __init__(self, df, page_size=None):
+    self.df = df
+    self.page_size = page_size or max(len(df), 1)
+    self.schema = [SimpleNamespace(name=coluna) for coluna in df.columns]
+
+  def to_dataframe_iterable(self):
+    for inicio in range(0, len(self.df), self.page_size):
+      yield self.df.iloc[inicio:inicio + self.page_size].reset_index(drop=True)
+
+
+class JobLocal:
+  def __init__(self, bytes_processados, df=None):
+    self.job_id = f'local_{uuid.uuid4().hex[:12]}'
+    self.total_bytes_processed = bytes_processados
+    self.cache_hit = False
+    self.df = df
+
+  def result(self, page_size=None):
+    return ResultadoLocal(self.df if self.df is not None else pd.DataFrame(), page_size)
+
+
+class ClienteLocal:
+  def __init__(self, resolver=None):
+    self.resolver = resolver
+
+  def query(self, sql, job_config=None):
+    parametros = {parametro.name: parametro.value for parametro in getattr(job_config, 'query_parameters', [])}
+    bytes_processados = estimar_bytes(sql, parametros)
+    if job_config is not None and job_config.dry_run:
+      return JobLocal(bytes_processados)
+    if self.resolver is None:
+      raise RuntimeError("O cliente local só estima bytes; informe um resolver para executar consultas.")
+    return JobLocal(bytes_processados, self.resolver(sql, parametros))
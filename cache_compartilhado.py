@@ -0,0 +1,251 @@
+import functools
+import io
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+import instrumentacao
+from armazem import DIRETORIO_DADOS
+from coalescencia import TIMEOUT, chave
+
+# Cache de resultados compartilhado entre os processos do Streamlit (réplicas atrás do balanceador)
+# e preservado entre reinícios. Fica atrás do st.cache_data, que continua sendo o cache em memória
+# de cada processo: numa falha dele, o resultado é procurado aqui antes de ir ao BigQuery ou às APIs.
+# - as chaves são o hash do conteúdo da chamada (fonte, função e argumentos, como a SQL e os parâmetros);
+# - cada fonte tem seu TTL (TTL_CACHE_<FONTE>, em segundos);
+# - o backend padrão é um diretório de arquivos Parquet, limitado a MAX_MB_CACHE_COMPARTILHADO e
+#   esvaziado por LRU (o horário de acesso de cada arquivo é atualizado a cada leitura);
+# - com CACHE_COMPARTILHADO=redis os resultados vão para o Redis em REDIS_URL, com o TTL como
+#   expiração; o limite de memória e a remoção por LRU ficam a cargo do próprio Redis
+#   (maxmemory e maxmemory-policy allkeys-lru).
+# Numa falha, a réplica reserva a chave antes de executar a função; as outras réplicas que pedem
+# a mesma chave enquanto isso esperam o resultado ser gravado em vez de repetir a consulta.
+# Só DataFrames são guardados; CACHE_COMPARTILHADO=desligado desativa o cache.
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.environ.get('CACHE_COMPARTILHADO', 'disco')
+DIRETORIO_CACHE = os.path.join(DIRETORIO_DADOS, 'cache')
+MAX_BYTES = int(float(os.environ.get('MAX_MB_CACHE_COMPARTILHADO', '1024')) * 1024 ** 2)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+PREFIXO_REDIS = 'dashboard_1746:'
+# Intervalo, em segundos, entre as verificações de quem espera uma chave reservada por outra réplica
+INTERVALO_ESPERA = 0.25
+
+TTL_PADRAO = 3600
+TTLS = {
+  'consulta': int(os.environ.get('TTL_CACHE_CONSULTA', '3600')),
+  'clima': int(os.environ.get('TTL_CACHE_CLIMA', '3600')),
+  'feriados': int(os.environ.get('TTL_CACHE_FERIADOS', str(3600 * 24))),
+}
+
+
+def para_bytes(df):
+  buffer = io.BytesIO()
+  df.to_parquet(buffer, index=False)
+  return buffer.getvalue()
+
+
+def de_bytes(conteudo):
+  return pd.read_parquet(io.BytesIO(conteudo))
+
+
+class CacheDisco:
+  def __init__(self, diretorio=DIRETORIO_CACHE, max_bytes=MAX_BYTES):
+    self.diretorio = diretorio
+    self.max_bytes = max_bytes
+    self.lock = threading.Lock()
+
+  def caminho(self, chave):
+    return os.path.join(self.diretorio, f"{chave}.parquet")
+
+  def caminho_reserva(self, chave):
+    return os.path.join(self.diretorio, f"{chave}.reserva")
+
+  # Cria o arquivo de reserva da chave se ainda não existir; reservas mais antigas que o timeout
+  # são de processos que morreram no meio da consulta e são descartadas
+  def reservar(self, chave, timeout):
+    os.makedirs(self.diretorio, exist_ok=True)
+    caminho = self.caminho_reserva(chave)
+    try:
+      os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+      return True
+    except FileExistsError:
+      try:
+        if time.time() - os.stat(caminho).st_mtime > timeout:
+          os.remove(caminho)
+          return self.reservar(chave, timeout)
+      except FileNotFoundError:
+        return self.reservar(chave, timeout)
+      return False
+
+  def reservado(self, chave):
+    return os.path.exists(self.caminho_reserva(chave))
+
+  def liberar(self, chave):
+    try:
+      os.remove(self.caminho_reserva(chave))
+    except FileNotFoundError:
+      pass
+
+  def obter(self, chave, ttl):
+    caminho = self.caminho(chave)
+    try:
+      criado = os.stat(caminho).st_mtime
+      if time.time() - criado > ttl:
+        return None
+      with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+      # O horário de acesso marca o uso para o LRU; o de modificação continua sendo o da gravação
+      os.utime(caminho, (time.time(), criado))
+    except FileNotFoundError:
+      # Removido por outro processo entre a listagem e a leitura
+      return None
+    return de_bytes(conteudo)
+
+  def gravar(self, chave, df, ttl):
+    os.makedirs(self.diretorio, exist_ok=True)
+    caminho = self.caminho(chave)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'wb') as arquivo:
+      arquivo.write(para_bytes(df))
+    os.replace(temporario, caminho)
+    self.remover_excedente()
+
+  # Remove os arquivos usados há mais tempo até o diretório caber no limite
+  def remover_excedente(self):
+    with self.lock:
+      arquivos = []
+      for entrada in os.scandir(self.diretorio):
+        if entrada.name.endswith('.parquet'):
+          try:
+            informacoes = entrada.stat()
+          except FileNotFoundError:
+            continue
+          arquivos.append((informacoes.st_atime, informacoes.st_size, entrada.path))
+      total = sum(tamanho for _, tamanho, _ in arquivos)
+      for _, tamanho, caminho in sorted(arquivos):
+        if total <= self.max_bytes:
+          break
+        try:
+          os.remove(caminho)
+        except FileNotFoundError:
+          pass
+        total -= tamanho
+
+  def limpar(self):
+    if os.path.isdir(self.diretorio):
+      for entrada in os.scandir(self.diretorio):
+        os.remove(entrada.path)
+
+
+class CacheRedis:
+  def __init__(self, url=REDIS_URL):
+    import redis
+    self.cliente = redis.Redis.from_url(url)
+
+  def obter(self, chave, ttl):
+    conteudo = self.cliente.get(PREFIXO_REDIS + chave)
+    return None if conteudo is None else de_bytes(conteudo)
+
+  def gravar(self, chave, df, ttl):
+    self.cliente.set(PREFIXO_REDIS + chave, para_bytes(df), ex=ttl)
+
+  def reservar(self, chave, timeout):
+    return bool(self.cliente.set(f"{PREFIXO_REDIS}reserva:{chave}", os.getpid(), nx=True, ex=int(timeout)))
+
+  def reservado(self, chave):
+    return bool(self.cliente.exists(f"{PREFIXO_REDIS}reserva:{chave}"))
+
+  def liberar(self, chave):
+    self.cliente.delete(f"{PREFIXO_REDIS}reserva:{chave}")
+
+  def limpar(self):
+    for chave in self.cliente.scan_iter(PREFIXO_REDIS + '*'):
+      self.cliente.delete(chave)
+
+
+_backend = None
+_lock = threading.Lock()
+
+
+def backend():
+  global _backend
+  with _lock:
+    if _backend is None and BACKEND != 'desligado':
+      if BACKEND == 'redis':
+        try:
+          _backend = CacheRedis()
+        except ImportError:
+          logger.warning("Pacote redis não instalado; usando o cache compartilhado em disco")
+      _backend = _backend or CacheDisco()
+    return _backend
+
+
+def ler(cache, chave_, ttl, fonte):
+  try:
+    return cache.obter(chave_, ttl)
+  except Exception:
+    logger.exception("Erro ao ler o cache compartilhado (%s)", fonte)
+    return None
+
+
+# Espera a réplica que reservou a chave gravar o resultado. Devolve None se a reserva for
+# liberada sem resultado (a consulta falhou lá) ou se o timeout passar; quem esperou então executa
+def esperar(cache, chave_, ttl, fonte):
+  limite = time.monotonic() + TIMEOUT
+  while time.monotonic() < limite:
+    time.sleep(INTERVALO_ESPERA)
+    resultado = ler(cache, chave_, ttl, fonte)
+    if resultado is not None or not cache.reservado(chave_):
+      return resultado
+  return None
+
+
+# Decorador: procura o resultado no cache compartilhado antes de executar a função.
+# Falhas do backend não impedem a chamada; o resultado só deixa de ser compartilhado.
+def compartilhado(fonte):
+  def decorador(funcao):
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+      cache = backend()
+      if cache is None:
+        return funcao(*args, **kwargs)
+      ttl = TTLS.get(fonte, TTL_PADRAO)
+      chave_ = chave(fonte, funcao, args, kwargs)
+      inicio = time.perf_counter()
+      resultado = ler(cache, chave_, ttl, fonte)
+      if resultado is None:
+        try:
+          reservada = cache.reservar(chave_, TIMEOUT)
+        except Exception:
+          logger.exception("Erro ao reservar a chave no cache compartilhado (%s)", fonte)
+          reservada = None
+        if reservada is False:
+          resultado = esperar(cache, chave_, ttl, fonte)
+      if resultado is not None:
+        instrumentacao.registrar('cache_compartilhado', instrumentacao.nome_funcao(funcao), time.perf_counter() - inicio,
+                                 len(resultado), cache='acerto')
+        return resultado
+
+      try:
+        resultado = funcao(*args, **kwargs)
+        if isinstance(resultado, pd.DataFrame):
+          try:
+            cache.gravar(chave_, resultado, ttl)
+          except Exception:
+            logger.exception("Erro ao gravar no cache compartilhado (%s)", fonte)
+      finally:
+        if reservada:
+          try:
+            cache.liberar(chave_)
+          except Exception:
+            logger.exception("Erro ao liberar a chave no cache compartilhado (%s)", fonte)
+      instrumentacao.registrar('cache_compartilhado', instrumentacao.nome_funcao(funcao), time.perf_counter() - inicio,
+                               instrumentacao.tamanho(resultado), cache='falha')
+      return resultado
+    return envolvida
+  return decorador
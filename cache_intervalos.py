@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from armazem import agrupar_intervalos, dias_do_intervalo, herdar_amostra
+
+# Cache em memória por segmento diário para funções com intervalo de datas.
+# Em vez de usar (data_inicio, data_fim) como chave, cada dia é guardado separadamente,
+# e só os sub-intervalos ainda não cobertos são buscados; o resultado é costurado a partir dos segmentos.
+# Cada segmento guarda a fração de amostra do resultado de onde veio (ver fonte_bigquery.ler_em_lotes),
+# e o resultado costurado informa a menor delas.
+# O cache vive enquanto o servidor estiver de pé, então a cada gravação os segmentos vencidos de
+# todas as chaves são descartados e, acima de MAX_MB_CACHE_INTERVALOS, os usados há mais tempo.
+
+MAX_BYTES = int(float(os.environ.get('MAX_MB_CACHE_INTERVALOS', '512')) * 1024 ** 2)
+
+
+class CacheIntervalos:
+  def __init__(self, ttl=3600, max_bytes=MAX_BYTES):
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    # (chave, dia) -> (criado, df, amostra, bytes), do usado há mais tempo para o mais recente
+    self.segmentos = OrderedDict()
+    self.total_bytes = 0
+    self.lock = threading.Lock()
+
+  def _remover(self, chave_segmento):
+    self.total_bytes -= self.segmentos.pop(chave_segmento)[3]
+
+  def _remover_vencidos(self):
+    agora = time.monotonic()
+    for chave_segmento in [chave for chave, (criado, *_) in self.segmentos.items() if agora - criado > self.ttl]:
+      self._remover(chave_segmento)
+
+  def _remover_excedente(self):
+    while self.total_bytes > self.max_bytes and self.segmentos:
+      self._remover(next(iter(self.segmentos)))
+
+  # Segmentos válidos da chave nos dias pedidos, marcados como usados agora
+  def _segmentos_validos(self, chave, dias):
+    agora = time.monotonic()
+    validos = {}
+    for dia in dias:
+      segmento = self.segmentos.get((chave, dia))
+      if segmento is None:
+        continue
+      if agora - segmento[0] > self.ttl:
+        self._remover((chave, dia))
+        continue
+      self.segmentos.move_to_end((chave, dia))
+      validos[dia] = segmento
+    return validos
+
+  def dias_faltantes(self, chave, data_inicio, data_fim):
+    dias = dias_do_intervalo(data_inicio, data_fim)
+    with self.lock:
+      validos = self._segmentos_validos(chave, dias)
+    return [dia for dia in dias if dia not in validos]
+
+  # buscar(inicio, fim) recebe um intervalo fechado de datas e retorna um DataFrame com a coluna `coluna_data`
+  def obter(self, chave, data_inicio, data_fim, buscar, coluna_data='data'):
+    dias = dias_do_intervalo(data_inicio, data_fim)
+    if not dias:
+      return pd.DataFrame(columns=[coluna_data])
+    with self.lock:
+      usados = self._segmentos_validos(chave, dias)
+
+    # Os segmentos buscados agora entram no resultado mesmo que a limpeza por tamanho os descarte
+    for inicio, fim in agrupar_intervalos([dia for dia in dias if dia not in usados]):
+      df = buscar(inicio, fim)
+      dia_da_linha = pd.to_datetime(df[coluna_data]).dt.date
+      por_dia = dict(tuple(df.groupby(dia_da_linha.values)))
+      vazio = df.iloc[0:0]
+      amostra = dict(df.attrs)
+      agora = time.monotonic()
+      novos = {}
+      for dia in dias_do_intervalo(inicio, fim):
+        parte = por_dia.get(dia, vazio)
+        novos[dia] = (agora, parte, amostra, int(parte.memory_usage(deep=True).sum()))
+      usados.update(novos)
+      with self.lock:
+        for dia, segmento in novos.items():
+          if (chave, dia) in self.segmentos:
+            self._remover((chave, dia))
+          self.segmentos[(chave, dia)] = segmento
+          self.total_bytes += segmento[3]
+        self._remover_vencidos()
+        self._remover_excedente()
+
+    partes = [usados[dia][1] for dia in dias]
+    df = pd.concat([parte for parte in partes if not parte.empty] or partes[:1], ignore_index=True)
+    return herdar_amostra(df, [usados[dia][2] for dia in dias])
+
+  def limpar(self):
+    with self.lock:
+      self.segmentos.clear()
+      self.total_bytes = 0
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+import clima
+import feriados
+from armazem import para_data
+
+# Calendário diário do Rio de Janeiro indexado por data (DatetimeIndex), com feriados, dia da
+# semana e clima em colunas. Notebooks e dashboard partem do mesmo quadro, lido dos arquivos
+# locais de clima e feriados (clima.py e feriados.py), e as análises de feriados e clima viram
+# operações vetorizadas sobre ele: juntar chamados diários é um join pelo índice, e as perguntas
+# por feriado ou por mês são filtros e agrupamentos, sem laços nem buscas por data.
+
+# Códigos WMO do Open-Meteo
+DESCRICOES_TEMPO = {
+  0: "Céu limpo", 1: "Predominantemente limpo", 2: "Parcialmente nublado", 3: "Nublado",
+  45: "Neblina", 48: "Neblina com geada", 51: "Garoa fraca", 53: "Garoa moderada",
+  55: "Garoa intensa", 56: "Garoa congelante fraca", 57: "Garoa congelante intensa",
+  61: "Chuva fraca", 63: "Chuva moderada", 65: "Chuva forte", 66: "Chuva congelante fraca",
+  67: "Chuva congelante forte", 71: "Neve fraca", 73: "Neve moderada",
+  75: "Neve forte", 77: "Grãos de neve", 80: "Pancadas de chuva fracas",
+  81: "Pancadas de chuva moderadas", 82: "Pancadas de chuva violentas", 85: "Pancadas de neve fracas",
+  86: "Pancadas de neve fortes", 95: "Trovoada", 96: "Trovoada com granizo fraco",
+  99: "Trovoada com granizo forte",
+}
+
+# Dia de praia: temperatura média de pelo menos 20 °C e céu no máximo parcialmente nublado (código < 3)
+TEMPERATURA_PRAIA = 20
+CODIGO_MAXIMO_PRAIA = 3
+# Temperatura média a partir da qual a pontuação de praia é máxima
+TEMPERATURA_PRAIA_IDEAL = 30
+
+
+# Quadro diário de data_inicio a data_fim a partir das tabelas de clima (clima.carregar) e de
+# feriados (feriados.carregar); dias sem clima ficam com NaN
+def montar(clima_diario, tabela_feriados, data_inicio, data_fim):
+  indice = pd.date_range(pd.Timestamp(para_data(data_inicio)), pd.Timestamp(para_data(data_fim)), freq='D', name='data')
+  calendario = pd.DataFrame(index=indice)
+  calendario['feriado'] = (feriados.por_data(tabela_feriados).set_index('data')['feriado'].reindex(indice)
+                           if len(tabela_feriados) else pd.Series(np.nan, index=indice, dtype='object'))
+  calendario['e_feriado'] = calendario['feriado'].notna()
+  calendario['dia_semana'] = indice.dayofweek
+  calendario['fim_de_semana'] = calendario['dia_semana'] >= 5
+  calendario['dia_util'] = ~(calendario['fim_de_semana'] | calendario['e_feriado'])
+
+  clima_diario = clima_diario.set_index(pd.to_datetime(clima_diario['data']))
+  for coluna in ('temperatura_media', 'precipitacao', 'weather_code'):
+    calendario[coluna] = clima_diario[coluna].reindex(indice).astype('float64')
+  calendario['tempo'] = descrever_tempo(calendario['weather_code'])
+  calendario['dia_de_praia'] = dia_de_praia(calendario)
+  calendario['pontuacao_praia'] = pontuacao_praia(calendario)
+  return calendario
+
+
+# Quadro pronto, lido dos arquivos locais (buscando nas APIs só o que falta); para os notebooks
+def carregar(data_inicio, data_fim):
+  inicio, fim = para_data(data_inicio), para_data(data_fim)
+  return montar(clima.carregar(inicio, fim), feriados.carregar(range(inicio.year, fim.year + 1)), inicio, fim)
+
+
+def descrever_tempo(codigos):
+  return pd.Categorical(pd.Series(codigos).map(DESCRICOES_TEMPO), categories=list(dict.fromkeys(DESCRICOES_TEMPO.values())))
+
+
+def dia_de_praia(calendario):
+  return ((calendario['temperatura_media'] >= TEMPERATURA_PRAIA)
+          & (calendario['weather_code'] < CODIGO_MAXIMO_PRAIA)).to_numpy()
+
+
+# De 0 a 1: zero fora dos dias de praia e crescente com a temperatura até TEMPERATURA_PRAIA_IDEAL
+def pontuacao_praia(calendario):
+  temperatura = ((calendario['temperatura_media'] - TEMPERATURA_PRAIA)
+                 / (TEMPERATURA_PRAIA_IDEAL - TEMPERATURA_PRAIA)).clip(0, 1)
+  return np.where(dia_de_praia(calendario), temperatura, 0.0)
+
+
+# Feriados do calendário com o clima do dia
+def tempo_feriados(calendario):
+  return calendario.loc[calendario['e_feriado'], ['feriado', 'dia_semana', 'fim_de_semana', 'temperatura_media',
+                                                 'precipitacao', 'weather_code', 'tempo', 'dia_de_praia', 'pontuacao_praia']]
+
+
+def feriados_por_mes(calendario):
+  return calendario['e_feriado'].groupby(calendario.index.month.rename('mes')).sum()
+
+
+# Dias de cada condição de tempo por mês (linhas: tempo; colunas: mês)
+def frequencia_tempo_mensal(calendario):
+  return (calendario.groupby(['tempo', calendario.index.to_period('M').rename('mes')], observed=True).size()
+          .unstack('mes', fill_value=0))
+
+
+# Condição de tempo mais frequente em cada mês (empates ficam com o menor código) e os dias com ela
+def tempo_predominante_mensal(calendario):
+  com_tempo = calendario.dropna(subset=['weather_code'])
+  contagem = com_tempo.groupby([com_tempo.index.to_period('M').rename('mes'), 'weather_code']).size()
+  predominante = contagem.sort_index().groupby(level='mes').idxmax()
+  resultado = pd.DataFrame({
+    'weather_code': [codigo for _, codigo in predominante],
+    'dias': contagem.loc[list(predominante)].to_numpy(),
+  }, index=predominante.index)
+  resultado['tempo'] = resultado['weather_code'].map(DESCRICOES_TEMPO)
+  return resultado
+
+
+# Junta ao quadro diário de chamados (coluna de data) as colunas do calendário, pelo índice
+def juntar(df, calendario, coluna='data', colunas=('feriado', 'e_feriado', 'fim_de_semana', 'dia_util')):
+  colunas_calendario = calendario[list(colunas)].reindex(pd.to_datetime(df[coluna]).dt.normalize())
+  return df.join(colunas_calendario.set_axis(df.index))
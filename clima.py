@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+import instrumentacao
+from armazem import DIRETORIO_DADOS, agrupar_intervalos, dias_do_intervalo, para_data
+
+# Arquivo local de clima diário do Rio de Janeiro (Open-Meteo), preenchido uma vez e
+# completado apenas com os dias que faltam. As páginas de clima leem daqui, sem ida à rede
+# quando o arquivo já cobre o intervalo (e sem importar o requests).
+
+OPEN_METEO_URL = os.environ.get('OPEN_METEO_URL', 'https://archive-api.open-meteo.com/v1/archive')
+LATITUDE = -22.9068
+LONGITUDE = -43.1729
+FUSO_HORARIO = 'America/Sao_Paulo'
+
+ARQUIVO_CLIMA = os.path.join(DIRETORIO_DADOS, 'clima', 'diario.parquet')
+INICIO_HISTORICO = date.fromisoformat(os.environ.get('INICIO_HISTORICO_CLIMA', '2020-01-01'))
+# Lacunas separadas por menos dias que isto são buscadas em uma única requisição
+DIAS_AGRUPAMENTO = 30
+MAX_DIAS_POR_REQUISICAO = 366
+TIMEOUT = (5, 30)
+# Os dias mais recentes voltam da API sem valores até o arquivo consolidar; um dia pedido que veio
+# vazio só é pedido de novo depois deste tempo, para que o intervalo padrão não vá à rede a cada leitura
+TTL_DIAS_SEM_DADOS = 6 * 3600
+
+# Variável da API -> coluna no arquivo local
+VARIAVEIS = {
+  'temperature_2m_mean': 'temperatura_media',
+  'precipitation_sum': 'precipitacao',
+  'weather_code': 'weather_code',
+}
+COLUNAS = ['data', *VARIAVEIS.values()]
+
+_lock = threading.Lock()
+_sessao = None
+# dia -> instante (time.monotonic) da última requisição em que veio sem valores
+_sem_dados = {}
+
+
+def sessao():
+  global _sessao
+  if _sessao is None:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    tentativas = Retry(total=4, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+    _sessao = requests.Session()
+    _sessao.mount('http://', HTTPAdapter(max_retries=tentativas))
+    _sessao.mount('https://', HTTPAdapter(max_retries=tentativas))
+  return _sessao
+
+
+def ler_arquivo():
+  if not os.path.exists(ARQUIVO_CLIMA):
+    return pd.DataFrame({coluna: pd.Series(dtype='datetime64[ns]' if coluna == 'data' else 'float64') for coluna in COLUNAS})
+  return pd.read_parquet(ARQUIVO_CLIMA)
+
+
+def salvar_arquivo(df):
+  os.makedirs(os.path.dirname(ARQUIVO_CLIMA), exist_ok=True)
+  temporario = f"{ARQUIVO_CLIMA}.{os.getpid()}.{threading.get_ident()}.tmp"
+  df.sort_values('data').to_parquet(temporario, index=False)
+  os.replace(temporario, ARQUIVO_CLIMA)
+
+
+@instrumentacao.medido('http')
+def buscar_api(inicio, fim):
+  parametros = {
+    'latitude': LATITUDE,
+    'longitude': LONGITUDE,
+    'start_date': inicio.isoformat(),
+    'end_date': fim.isoformat(),
+    'daily': ','.join(VARIAVEIS),
+    'timezone': FUSO_HORARIO,
+  }
+  resposta = sessao().get(OPEN_METEO_URL, params=parametros, timeout=TIMEOUT)
+  resposta.raise_for_status()
+  diario = resposta.json()['daily']
+  df = pd.DataFrame({'data': pd.to_datetime(diario['time'])})
+  for variavel, coluna in VARIAVEIS.items():
+    df[coluna] = pd.to_numeric(pd.Series(diario.get(variavel, [None] * len(df))), errors='coerce')
+  # O arquivo da API demora alguns dias para consolidar; dias ainda sem valores não são guardados
+  return df.dropna(subset=list(VARIAVEIS.values()), how='all')
+
+
+# Junta lacunas próximas e divide em blocos de até MAX_DIAS_POR_REQUISICAO dias
+def planejar_requisicoes(dias):
+  blocos = []
+  for inicio, fim in agrupar_intervalos(dias):
+    if blocos and (inicio - blocos[-1][1]).days <= DIAS_AGRUPAMENTO:
+      blocos[-1][1] = fim
+    else:
+      blocos.append([inicio, fim])
+  requisicoes = []
+  for inicio, fim in blocos:
+    while inicio <= fim:
+      fim_bloco = min(fim, inicio + timedelta(days=MAX_DIAS_POR_REQUISICAO - 1))
+      requisicoes.append((inicio, fim_bloco))
+      inicio = fim_bloco + timedelta(days=1)
+  return requisicoes
+
+
+def sincronizar(data_inicio, data_fim):
+  inicio = para_data(data_inicio)
+  fim = min(para_data(data_fim), date.today())
+  if inicio > fim:
+    return
+  with _lock:
+    df = ler_arquivo()
+    presentes = set(df['data'].dt.date)
+    agora = time.monotonic()
+    for dia in [dia for dia, verificado in _sem_dados.items() if agora - verificado > TTL_DIAS_SEM_DADOS]:
+      del _sem_dados[dia]
+    faltantes = [dia for dia in dias_do_intervalo(inicio, fim) if dia not in presentes and dia not in _sem_dados]
+    if not faltantes:
+      return
+    novos = [buscar_api(inicio_bloco, fim_bloco) for inicio_bloco, fim_bloco in planejar_requisicoes(faltantes)]
+    recebidos = {dia for novo in novos for dia in novo['data'].dt.date}
+    for dia in faltantes:
+      if dia not in recebidos:
+        _sem_dados[dia] = agora
+    df = pd.concat([df, *novos], ignore_index=True).drop_duplicates('data', keep='last')
+    salvar_arquivo(df)
+
+
+# Preenche o histórico inteiro de uma vez (útil ao subir o servidor pela primeira vez)
+def preencher_historico():
+  sincronizar(INICIO_HISTORICO, date.today())
+
+
+# Clima do intervalo só com o que já está no arquivo local, sem ir à API
+def ler_intervalo(data_inicio, data_fim):
+  df = ler_arquivo()
+  inicio, fim = pd.Timestamp(para_data(data_inicio)), pd.Timestamp(para_data(data_fim))
+  df = df[(df['data'] >= inicio) & (df['data'] <= fim)]
+  return df.sort_values('data').reset_index(drop=True)
+
+
+def carregar(data_inicio, data_fim):
+  sincronizar(data_inicio, data_fim)
+  return ler_intervalo(data_inicio, data_fim)
@@ -0,0 +1,87 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date
+
+import pandas as pd
+
+import instrumentacao
+
+# Coalescência de chamadas idênticas simultâneas ("single flight"): quando várias sessões pedem o
+# mesmo dado ao mesmo tempo (um link compartilhado abrindo a mesma página com o intervalo padrão),
+# só a primeira executa; as demais esperam o mesmo Future e recebem o resultado ou a exceção dela.
+# Vale dentro do processo; entre réplicas, a mesma ideia é aplicada pelo cache compartilhado com
+# uma reserva por chave (ver cache_compartilhado.py).
+
+# Tempo máximo, em segundos, que uma chamada espera pela chamada idêntica em andamento
+TIMEOUT = float(os.environ.get('TIMEOUT_COALESCENCIA', '600'))
+
+_em_andamento = {}
+_lock = threading.Lock()
+
+
+class TempoEsgotado(TimeoutError):
+  pass
+
+
+# Sinal para quem espera: a chamada líder foi interrompida sem resultado nem erro da função
+class ChamadaInterrompida(Exception):
+  pass
+
+
+def normalizar(valor):
+  if isinstance(valor, (date, pd.Timestamp)):
+    return valor.isoformat()
+  if isinstance(valor, (list, tuple)):
+    return tuple(normalizar(item) for item in valor)
+  return valor
+
+
+# Chave pelo conteúdo da chamada; datas entram em ISO para que date e string gerem a mesma chave
+def chave(fonte, funcao, args, kwargs):
+  conteudo = repr((fonte, f"{funcao.__module__}.{funcao.__qualname__}", normalizar(args),
+                   sorted((nome, normalizar(valor)) for nome, valor in kwargs.items())))
+  return hashlib.blake2b(conteudo.encode(), digest_size=20).hexdigest()
+
+
+# Decorador: chamadas com os mesmos argumentos (normalizados) enquanto outra está em andamento esperam o resultado dela
+def coalescido(funcao):
+  @functools.wraps(funcao)
+  def envolvida(*args, **kwargs):
+    chave_ = chave('coalescencia', funcao, args, kwargs)
+    with _lock:
+      futuro = _em_andamento.get(chave_)
+      lider = futuro is None
+      if lider:
+        futuro = _em_andamento[chave_] = Future()
+
+    if not lider:
+      inicio = time.perf_counter()
+      try:
+        resultado = futuro.result(timeout=TIMEOUT)
+      except TimeoutError:
+        raise TempoEsgotado(f"{instrumentacao.nome_funcao(funcao)}: chamada idêntica em andamento há mais de {TIMEOUT:.0f}s")
+      except ChamadaInterrompida:
+        return envolvida(*args, **kwargs)
+      instrumentacao.registrar('coalescencia', instrumentacao.nome_funcao(funcao), time.perf_counter() - inicio,
+                               instrumentacao.tamanho(resultado), cache='acerto')
+      # Cópia rasa: quem esperou pode acrescentar colunas sem alterar o DataFrame da primeira chamada
+      return resultado.copy(deep=False) if isinstance(resultado, pd.DataFrame) else resultado
+
+    try:
+      resultado = funcao(*args, **kwargs)
+    except BaseException as erro:
+      with _lock:
+        del _em_andamento[chave_]
+      # Exceções de controle da sessão líder (RerunException e StopException do Streamlit derivam
+      # de BaseException) não são repassadas: quem espera repete a chamada e calcula o resultado
+      futuro.set_exception(erro if isinstance(erro, Exception) else ChamadaInterrompida())
+      raise
+    with _lock:
+      del _em_andamento[chave_]
+    futuro.set_result(resultado)
+    return resultado
+  return envolvida
@@ -0,0 +1,60 @@
+import functools
+import logging
+from datetime import date
+
+import pandas as pd
+
+# Normalização dos DataFrames retornados pelas funções get_* antes de entrarem no st.cache_data:
+# textos repetidos viram categorias, inteiros e floats são estreitados e colunas de data passam a datetime64.
+
+logger = logging.getLogger(__name__)
+
+# Colunas de texto com menos valores distintos que esta fração das linhas viram categoria
+FRACAO_MAXIMA_CATEGORIA = 0.5
+
+
+def eh_coluna_de_datas(serie):
+  if str(serie.dtype) == 'dbdate':
+    return True
+  if serie.dtype != object:
+    return False
+  amostra = serie.dropna().head(100)
+  return len(amostra) > 0 and all(isinstance(valor, date) for valor in amostra)
+
+
+def compactar(df):
+  df = df.copy()
+  for coluna in df.columns:
+    serie = df[coluna]
+    if eh_coluna_de_datas(serie):
+      df[coluna] = pd.to_datetime(serie)
+    elif pd.api.types.is_bool_dtype(serie):
+      continue
+    elif pd.api.types.is_integer_dtype(serie):
+      df[coluna] = pd.to_numeric(serie, downcast='integer')
+    elif pd.api.types.is_float_dtype(serie):
+      df[coluna] = pd.to_numeric(serie, downcast='float')
+    elif (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)) and len(serie) > 0:
+      if serie.nunique(dropna=True) <= FRACAO_MAXIMA_CATEGORIA * len(serie):
+        df[coluna] = serie.astype('category')
+  return df
+
+
+def memoria(df):
+  return int(df.memory_usage(deep=True).sum())
+
+
+# Decorador para as funções get_*: compacta o resultado e registra a memória antes e depois
+def compactar_resultado(funcao):
+  @functools.wraps(funcao)
+  def envolvida(*args, **kwargs):
+    df = funcao(*args, **kwargs)
+    if not isinstance(df, pd.DataFrame) or df.empty:
+      return df
+    antes = memoria(df)
+    df = compactar(df)
+    depois = memoria(df)
+    logger.info("%s: %d linhas, memória %.1f KB -> %.1f KB (%.0f%%)",
+                funcao.__name__, len(df), antes / 1024, depois / 1024, 100 * depois / max(antes, 1))
+    return df
+  return envolvida
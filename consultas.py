@@ -0,0 +1,153 @@
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+import pandas as pd
+
+import mapa
+
+# Modelos de consulta com parâmetros nomeados para o BigQuery.
+# O texto SQL de cada modelo é fixo e os valores vão em parâmetros tipados, então a mesma
+# consulta lógica gera sempre o mesmo job (aproveitando o cache de resultados do BigQuery)
+# e nenhum valor escolhido na interface é interpolado no SQL.
+
+# parametros: tupla de (nome, tipo BigQuery, valor), hashável para o st.cache_data
+Consulta = namedtuple('Consulta', ['sql', 'parametros'])
+
+TABELA_CHAMADO = '`datario.adm_central_atendimento_1746.chamado`'
+TABELA_BAIRRO = '`datario.dados_mestres.bairro`'
+TABELA_EVENTOS = '`datario.turismo_fluxo_visitantes.rede_hoteleira_ocupacao_eventos`'
+
+# A tabela de chamados é particionada por mês em `data_particao`; filtrar só por `data_inicio`
+# não poda partições, então todo filtro de intervalo inclui também a coluna de partição
+FILTRO_INTERVALO = """data_inicio >= @inicio AND data_inicio < @fim
+AND data_particao BETWEEN DATE_TRUNC(DATE(@inicio), MONTH) AND DATE(@fim)"""
+
+SQL_AGREGADO_DIARIO = f"""
+SELECT
+    DATE(data_inicio) as data,
+    tipo,
+    status,
+    EXTRACT(HOUR FROM data_inicio) as hora,
+    id_bairro,
+    COUNT(*) as contagem
+FROM {TABELA_CHAMADO}
+WHERE {FILTRO_INTERVALO}
+GROUP BY data, tipo, status, hora, id_bairro
+"""
+
+# Só toca `data_inicio` e a partição: usada pelo refresh dos rollups para detectar dias alterados
+SQL_CONTAGEM_DIARIA = f"""
+SELECT
+    DATE(data_inicio) as data,
+    COUNT(*) as contagem,
+    MAX(data_inicio) as ultimo_inicio
+FROM {TABELA_CHAMADO}
+WHERE {FILTRO_INTERVALO}
+GROUP BY data
+"""
+
+SQL_GEOLOCALIZADOS = f"""
+SELECT
+    id_bairro,
+    tipo,
+    status,
+    CAST(latitude AS FLOAT64) as latitude,
+    CAST(longitude AS FLOAT64) as longitude,
+    data_inicio
+FROM {TABELA_CHAMADO}
+WHERE {FILTRO_INTERVALO}
+AND latitude IS NOT NULL
+AND longitude IS NOT NULL
+"""
+
+SQL_GEOLOCALIZADOS_BAIRRO = SQL_GEOLOCALIZADOS + "AND id_bairro = @id_bairro\n"
+
+SQL_GRADE = f"""
+SELECT
+    DATE(data_inicio) as data,
+    {mapa.expressao_celula('latitude')} as latitude,
+    {mapa.expressao_celula('longitude')} as longitude,
+    tipo,
+    status,
+    COUNT(*) as contagem
+FROM {TABELA_CHAMADO}
+WHERE {FILTRO_INTERVALO}
+AND latitude IS NOT NULL
+AND longitude IS NOT NULL
+GROUP BY data, latitude, longitude, tipo, status
+"""
+
+SQL_BAIRROS = f"""
+SELECT id_bairro, nome, subprefeitura, ST_ASTEXT(geometria) as geometria
+FROM {TABELA_BAIRRO}
+"""
+
+SQL_EVENTOS = f"""
+SELECT evento, data_inicial, data_final, taxa_ocupacao
+FROM {TABELA_EVENTOS}
+"""
+
+# Consultas de linhas brutas, que podem ser amostradas quando estouram o orçamento de bytes;
+# as agregações não, pois a amostra distorceria as contagens
+MODELOS_AMOSTRAVEIS = (SQL_GEOLOCALIZADOS, SQL_GEOLOCALIZADOS_BAIRRO)
+
+
+# Converte um intervalo fechado de dias em limites semiabertos [início, fim + 1 dia) de DATETIME,
+# para que o último dia entre inteiro (um BETWEEN com a data final cortaria tudo após 00:00)
+def intervalo_semiaberto(data_inicio, data_fim):
+  inicio = pd.Timestamp(data_inicio).normalize()
+  fim = pd.Timestamp(data_fim).normalize() + timedelta(days=1)
+  return (('inicio', 'DATETIME', inicio.to_pydatetime()),
+          ('fim', 'DATETIME', fim.to_pydatetime()))
+
+
+# Nome estável de cada modelo, usado como rótulo nas métricas (ver instrumentacao.py)
+NOMES_MODELOS = {
+  SQL_AGREGADO_DIARIO: 'agregado_diario',
+  SQL_CONTAGEM_DIARIA: 'contagem_diaria',
+  SQL_GEOLOCALIZADOS: 'chamados_geolocalizados',
+  SQL_GEOLOCALIZADOS_BAIRRO: 'chamados_geolocalizados_bairro',
+  SQL_GRADE: 'grade_geolocalizada',
+  SQL_BAIRROS: 'bairros',
+  SQL_EVENTOS: 'eventos',
+}
+
+
+def nome_modelo(sql):
+  return NOMES_MODELOS.get(re.sub(r' TABLESAMPLE SYSTEM \([\d.]+ PERCENT\)', '', sql), 'outra')
+
+
+def amostravel(sql):
+  return sql in MODELOS_AMOSTRAVEIS
+
+
+def com_amostra(sql, porcentagem):
+  return sql.replace(f"FROM {TABELA_CHAMADO}", f"FROM {TABELA_CHAMADO} TABLESAMPLE SYSTEM ({porcentagem:.3f} PERCENT)", 1)
+
+
+def agregado_diario(data_inicio, data_fim):
+  return Consulta(SQL_AGREGADO_DIARIO, intervalo_semiaberto(data_inicio, data_fim))
+
+
+def contagem_diaria(data_inicio, data_fim):
+  return Consulta(SQL_CONTAGEM_DIARIA, intervalo_semiaberto(data_inicio, data_fim))
+
+
+def chamados_geolocalizados(data_inicio, data_fim, id_bairro=None):
+  if id_bairro is None:
+    return Consulta(SQL_GEOLOCALIZADOS, intervalo_semiaberto(data_inicio, data_fim))
+  parametros = intervalo_semiaberto(data_inicio, data_fim) + (('id_bairro', 'STRING', str(id_bairro)),)
+  return Consulta(SQL_GEOLOCALIZADOS_BAIRRO, parametros)
+
+
+def grade_geolocalizada(data_inicio, data_fim):
+  return Consulta(SQL_GRADE, intervalo_semiaberto(data_inicio, data_fim))
+
+
+def bairros():
+  return Consulta(SQL_BAIRROS, ())
+
+
+def eventos():
+  return Consulta(SQL_EVENTOS, ())
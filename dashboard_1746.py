@@ -1,170 +1,376 @@
+import time
+# Início da execução do script, antes das importações, para medir a partida a frio
+INICIO_SCRIPT = time.time()
 import streamlit as st
 import os
 from dotenv import load_dotenv
+# O .env é carregado antes dos módulos do projeto, que leem suas configurações do ambiente ao serem importados
+load_dotenv()
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import basedosdados as bd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import calendar
-import requests
+import functools
+import importlib
+import consultas
+import graficos
+import tabela
+import analise_clima
+import calendario
+import intervalos
+import instrumentacao
+import rollups
+import bairros
+import armazem_geolocalizado
+import clima
+import feriados
+from armazem import MAX_DIAS_POR_CONSULTA, agrupar_intervalos, dias_do_intervalo, dividir_intervalos, herdar_amostra
+from cache_intervalos import CacheIntervalos
+import mapa
+import fonte_bigquery
+import cache_compartilhado
+import coalescencia
+import aquecimento
+from compactacao import compactar_resultado
+from paralelo import carregar_em_paralelo
+
+# Tempo das importações; na primeira execução do processo é o custo da partida a frio. plotly.express
+# e o cliente do BigQuery são importados só quando usados (ver aquecimento.py)
+instrumentacao.registrar('inicializacao', 'importacoes', time.time() - INICIO_SCRIPT)
+instrumentacao.marcar('importacoes', time.time() - INICIO_SCRIPT)
 
 # Configuração inicial
 st.set_page_config(page_title="Dashboard Rio de Janeiro", layout="wide")
 
-load_dotenv()
 billing_project_id = os.environ['billing_project_id']
 
-# Função para executar queries
-@st.cache_data(ttl=3600)
-def run_query(query):
-  return bd.read_sql(query, billing_project_id=billing_project_id)
+# Função para executar queries com parâmetros nomeados (ver consultas.py), lidas em lotes com
+# limite de linhas e memória (ver fonte_bigquery.py). Abaixo do st.cache_data de cada processo,
+# os resultados ficam no cache compartilhado entre as réplicas (ver cache_compartilhado.py)
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'consulta')
+@cache_compartilhado.compartilhado('consulta')
+@compactar_resultado
+def run_query(query, parametros=()):
+  return fonte_bigquery.executar(query, billing_project_id, parametros)
 
 # Funções para obter dados específicos
 
-@st.cache_data(ttl=3600)
+# Segmentos diários compartilhados entre as sessões, para que janelas sobrepostas só busquem os dias novos
+@st.cache_resource
+def get_cache_intervalos():
+  return CacheIntervalos(ttl=3600)
+
+# As páginas leem apenas os rollups pré-materializados (ver rollups.py e atualizar_rollups.py).
+# As leituras do armazém não passam pelo st.cache_data, então sessões que pedem o mesmo intervalo
+# ao mesmo tempo esperam a primeira leitura em vez de repeti-la (ver coalescencia.py)
+@instrumentacao.medido('armazem')
+@coalescencia.coalescido
+@compactar_resultado
+def get_rollup(nome, data_inicio, data_fim):
+  return get_cache_intervalos().obter(
+    nome, data_inicio, data_fim,
+    lambda inicio, fim: rollups.carregar(nome, inicio, fim, run_query))
+
+@instrumentacao.medido('transformacao')
 def get_chamados_summary(data_inicio, data_fim):
-  query = f"""
-  SELECT 
-      tipo as servico,
-      status,
-      DATE(data_inicio) as data,
-      COUNT(*) as contagem
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE data_inicio BETWEEN '{data_inicio}' AND '{data_fim}'
-  GROUP BY tipo, status, DATE(data_inicio)
-  """
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
-def get_bairros():
-  query = "SELECT id_bairro, nome FROM `datario.dados_mestres.bairro`"
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
+  return get_rollup('dia_tipo_status', data_inicio, data_fim).rename(columns={'tipo': 'servico'})
+
+# Dimensão de bairros carregada uma vez e compartilhada entre as sessões (ver bairros.py)
+@st.cache_resource(ttl=3600*24)
+def get_indice_bairros():
+  return bairros.IndiceBairros(run_query(*consultas.bairros()))
+
+# Chamados geolocalizados lidos do armazém particionado por bairro (ver armazem_geolocalizado.py):
+# a primeira leitura de um intervalo busca todos os bairros de uma vez
+@instrumentacao.medido('armazem')
+@coalescencia.coalescido
 def get_chamados_por_bairro(bairro_id, data_inicio, data_fim):
-  query = f"""
-  SELECT 
-      tipo,
-      status,
-      CAST(latitude AS FLOAT64) as latitude,
-      CAST(longitude AS FLOAT64) as longitude,
-      data_inicio
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE id_bairro = '{bairro_id}'
-  AND data_inicio BETWEEN '{data_inicio}' AND '{data_fim}'
-  AND latitude IS NOT NULL
-  AND longitude IS NOT NULL
-  """
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
+  return get_cache_intervalos().obter(
+    ('bairro', bairro_id), data_inicio, data_fim,
+    lambda inicio, fim: armazem_geolocalizado.carregar(inicio, fim, run_query, bairro_id), 'data_inicio')
+
+@instrumentacao.medido('armazem')
+@coalescencia.coalescido
 def get_chamados_geral(data_inicio, data_fim):
-  query = f"""
-  SELECT 
-      tipo,
-      status,
-      CAST(latitude AS FLOAT64) as latitude,
-      CAST(longitude AS FLOAT64) as longitude,
-      data_inicio
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE data_inicio BETWEEN '{data_inicio}' AND '{data_fim}'
-  AND latitude IS NOT NULL
-  AND longitude IS NOT NULL
-  """
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
+  return get_cache_intervalos().obter(
+    'geral', data_inicio, data_fim,
+    lambda inicio, fim: armazem_geolocalizado.carregar(inicio, fim, run_query), 'data_inicio')
+
+@instrumentacao.medido('transformacao')
+def get_chamados_bairros(data_inicio, data_fim):
+  chamados = get_rollup('dia_bairro', data_inicio, data_fim)
+  return chamados.groupby('id_bairro', as_index=False, dropna=False, observed=True)['contagem'].sum()
+
+# Grade diária de um intervalo, em consultas de até MAX_DIAS_POR_CONSULTA dias: o número de linhas
+# cresce com o intervalo e uma consulta única estouraria MAX_LINHAS_CONSULTA em intervalos longos
+def buscar_grade(data_inicio, data_fim):
+  partes = [run_query(*consultas.grade_geolocalizada(inicio, fim))
+            for inicio, fim in dividir_intervalos([(data_inicio, data_fim)], MAX_DIAS_POR_CONSULTA)]
+  return herdar_amostra(pd.concat(partes, ignore_index=True), [parte.attrs for parte in partes])
+
+# Chamados geolocalizados agregados por dia e célula da grade diretamente na query
+@instrumentacao.medido('armazem')
+@coalescencia.coalescido
+def get_chamados_geral_grade(data_inicio, data_fim):
+  grade = get_cache_intervalos().obter('geral_grade', data_inicio, data_fim, buscar_grade)
+  return grade.groupby(['latitude', 'longitude', 'tipo', 'status'], as_index=False, observed=True)['contagem'].sum()
+
+# Acima do limite de pontos, os chamados já chegam agregados em grade pelo BigQuery
+def get_chamados_mapa(data_inicio, data_fim):
+  modo_agregado = get_rollup('dia_tipo_status', data_inicio, data_fim)['contagem'].sum() > mapa.LIMITE_PONTOS_MAPA
+  if modo_agregado:
+    return get_chamados_geral_grade(data_inicio, data_fim), True
+  return get_chamados_geral(data_inicio, data_fim).assign(contagem=1), False
+
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'consulta')
 def get_eventos():
-  query = """
-  SELECT *
-  FROM `datario.turismo_fluxo_visitantes.rede_hoteleira_ocupacao_eventos`
-  """
-  return run_query(query)
+  return run_query(*consultas.eventos())
 
-@st.cache_data(ttl=3600)
+@instrumentacao.medido('transformacao')
 def get_chamados_por_periodo(data_inicial, data_final):
-  query = f"""
-  SELECT 
-      DATE(data_inicio) as data,
-      tipo,
-      COUNT(*) as contagem
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE data_inicio BETWEEN '{data_inicial}' AND '{data_final}'
-  GROUP BY data, tipo
-  """
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
+  chamados = get_rollup('dia_tipo_status', data_inicial, data_final)
+  return chamados.groupby(['data', 'tipo'], as_index=False, dropna=False, observed=True)['contagem'].sum()
+
+@instrumentacao.medido('transformacao')
 def get_chamados_tendencias(data_inicio, data_fim):
-  query = f"""
-  SELECT 
-      DATE(data_inicio) as data,
-      EXTRACT(HOUR FROM data_inicio) as hora,
-      EXTRACT(DAYOFWEEK FROM data_inicio) as dia_semana,
-      EXTRACT(MONTH FROM data_inicio) as mes,
-      tipo,
-      COUNT(*) as contagem
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE data_inicio BETWEEN '{data_inicio}' AND '{data_fim}'
-  GROUP BY data, hora, dia_semana, mes, tipo
-  """
-  return run_query(query)
-
-@st.cache_data(ttl=3600)
+  chamados = get_chamados_por_periodo(data_inicio, data_fim)
+  return chamados.assign(mes=chamados['data'].dt.month.astype('int8'))
+
+@instrumentacao.medido('transformacao')
+def get_chamados_por_hora(data_inicio, data_fim):
+  chamados = get_rollup('dia_hora', data_inicio, data_fim)
+  return chamados.assign(dia_semana=rollups.dia_semana(chamados['data']))
+
+@instrumentacao.medido('transformacao')
 def get_chamados(data_inicio, data_fim):
-  query = f"""
-  SELECT 
-      DATE(data_inicio) as data,
-      tipo,
-      COUNT(*) as contagem_chamados
-  FROM `datario.adm_central_atendimento_1746.chamado`
-  WHERE data_inicio BETWEEN '{data_inicio}' AND '{data_fim}'
-  GROUP BY data, tipo
-  """
-  df = run_query(query)
-  df['data'] = pd.to_datetime(df['data'])  # Ensure 'data' is datetime
-  return df
-
-@st.cache_data(ttl=3600)
+  return get_chamados_por_periodo(data_inicio, data_fim).rename(columns={'contagem': 'contagem_chamados'})
+
+DIAS_JANELA_EVENTO = 7
+
+# Chamados diários de todos os eventos, marcados com o evento e o período (Antes, Durante, Depois)
+# pela junção por intervalo local (ver intervalos.py). Os dias cobertos por alguma janela são lidos
+# uma vez por trecho contínuo, então janelas sobrepostas não repetem a leitura.
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'transformacao')
+def get_chamados_eventos():
+  eventos = get_eventos()
+  dias = {dia for evento in eventos.itertuples()
+          for dia in dias_do_intervalo(evento.data_inicial - timedelta(days=DIAS_JANELA_EVENTO),
+                                       evento.data_final + timedelta(days=DIAS_JANELA_EVENTO))}
+  trechos = carregar_em_paralelo(*[(get_chamados_por_periodo, inicio, fim) for inicio, fim in agrupar_intervalos(dias)])
+  chamados = pd.concat(trechos, ignore_index=True) if trechos else get_chamados_por_periodo(date.today(), date.today()).iloc[0:0]
+  return intervalos.marcar_eventos(chamados, eventos, 'data', DIAS_JANELA_EVENTO, DIAS_JANELA_EVENTO)
+
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'api')
+@compactar_resultado
 def get_weather_data(start_date, end_date):
-  latitude = -22.9068
-  longitude = -43.1729
-  
-  url = f"https://archive-api.open-meteo.com/v1/archive?latitude={latitude}&longitude={longitude}&start_date={start_date}&end_date={end_date}&daily=temperature_2m_mean,precipitation_sum&timezone=America%2FSao_Paulo"
-  
-  response = requests.get(url)
-  data = response.json()
-  
-  df = pd.DataFrame({
-      'data': pd.to_datetime(data['daily']['time']),
-      'temperatura_media': data['daily']['temperature_2m_mean'],
-      'precipitacao': data['daily']['precipitation_sum']
-  })
-  
-  return df
+  import requests
+  try:
+    return carregar_clima(start_date, end_date)
+  except requests.RequestException as erro:
+    st.warning(f"Não foi possível completar o clima pelo Open-Meteo ({erro}); exibindo apenas os dias já guardados.")
+    return clima.ler_intervalo(start_date, end_date)
+
+# Lê do arquivo local de clima, buscando no Open-Meteo apenas os dias que ainda faltam (ver clima.py).
+# Como em carregar_feriados, só o resultado completo vai para o cache compartilhado
+@cache_compartilhado.compartilhado('clima')
+def carregar_clima(start_date, end_date):
+  return clima.carregar(start_date, end_date)
+
+# Calendário de feriados de todos os anos, lido do arquivo local e completado pela API só nos anos ausentes
+@instrumentacao.com_cache(st.cache_data(ttl=3600*24), 'api')
+@compactar_resultado
+def get_feriados():
+  import requests
+  try:
+    return carregar_feriados()
+  except requests.RequestException as erro:
+    st.error(f"Erro ao obter feriados: {erro}")
+    return feriados.ler_arquivo()
+
+# Só o calendário obtido com sucesso vai para o cache compartilhado, não o arquivo lido após uma falha da API
+@cache_compartilhado.compartilhado('feriados')
+def carregar_feriados():
+  return feriados.carregar()
+
+# Calendário diário indexado por data, com feriados, dia da semana e clima (ver calendario.py);
+# o mesmo quadro que os notebooks carregam com calendario.carregar
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'transformacao')
+def get_calendario(data_inicio, data_fim):
+  clima_diario, todos_feriados = carregar_em_paralelo(
+    (get_weather_data, data_inicio, data_fim),
+    (get_feriados,),
+  )
+  return calendario.montar(clima_diario, todos_feriados, data_inicio, data_fim)
 
-@st.cache_data(ttl=3600*24)
-def get_holidays(year):
-  url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/BR"
-  response = requests.get(url)
-  if response.status_code == 200:
-      return pd.DataFrame(response.json())
-  else:
-      st.error(f"Erro ao obter feriados: {response.status_code}")
-      return pd.DataFrame()
+
+# Tabelas da página de impacto climático (ver analise_clima.py), guardadas por intervalo de datas
+@instrumentacao.com_cache(st.cache_data(ttl=3600), 'transformacao')
+def get_impacto_climatico(data_inicio, data_fim):
+  chamados, clima_diario = carregar_em_paralelo(
+    (get_chamados, data_inicio, data_fim),
+    (get_weather_data, data_inicio, data_fim),
+  )
+  return analise_clima.impacto(chamados, clima_diario)
+
+
+def anos_feriados():
+  return range(feriados.PRIMEIRO_ANO, datetime.now().year + 1)
+
+
+# Intervalos padrão das páginas (últimos 30 dias; 180 em Tendências Temporais), com os mesmos
+# argumentos que as páginas passam, para que o aquecimento preencha as mesmas chaves de cache
+def tarefas_aquecimento():
+  hoje = datetime.now().date()
+  inicio_30, inicio_180 = hoje - timedelta(days=30), hoje - timedelta(days=180)
+  ano_padrao = anos_feriados()[0]
+
+  # Bairro selecionado por padrão na página Análise por Bairro
+  def chamados_bairro_padrao(data_inicio, data_fim):
+    indice = get_indice_bairros()
+    return get_chamados_por_bairro(indice.id_bairro(indice.nomes()[0]), data_inicio, data_fim)
+
+  return [
+    ('plotly.express', importlib.import_module, 'plotly.express'),
+    ('bairros', get_indice_bairros),
+    ('visao_geral', get_chamados_summary, inicio_30, hoje),
+    ('bairro', chamados_bairro_padrao, inicio_30, hoje),
+    ('ranking_bairros', get_chamados_bairros, inicio_30, hoje),
+    ('mapa_geral', get_chamados_mapa, inicio_30, hoje),
+    ('tendencias', get_chamados_tendencias, inicio_180, hoje),
+    ('tendencias_por_hora', get_chamados_por_hora, inicio_180, hoje),
+    ('impacto_climatico', get_impacto_climatico, inicio_30, hoje),
+    ('eventos', get_chamados_eventos),
+    ('calendario_feriados', get_calendario, f"{ano_padrao}-01-01", f"{ano_padrao}-12-31"),
+    ('chamados_ano_feriados', get_chamados, f"{ano_padrao}-01-01", f"{ano_padrao}-12-31"),
+  ]
+
+
+# Inicia o aquecimento uma vez por processo, na primeira execução do script
+@st.cache_resource
+def iniciar_aquecimento():
+  return aquecimento.iniciar(tarefas_aquecimento())
+
+
+# Mapa de densidade a partir de chamados agregados em grade (ver mapa.py)
+def mapa_densidade(grade, zoom, titulo):
+  import plotly.express as px
+  celulas = mapa.resumir_celulas(grade)
+  fig = px.density_mapbox(celulas,
+                          lat='latitude',
+                          lon='longitude',
+                          z='contagem',
+                          hover_data=['tipo_predominante'],
+                          radius=8,
+                          zoom=zoom,
+                          mapbox_style="open-street-map",
+                          title=titulo)
+  return fig
+
+
+# Mapa de pins coloridos por tipo de chamado
+def mapa_pontos(chamados, zoom, titulo, tamanho):
+  import plotly.express as px
+  fig = px.scatter_mapbox(chamados,
+                          lat='latitude',
+                          lon='longitude',
+                          color='tipo',
+                          hover_data=['status', 'data_inicio'],
+                          zoom=zoom,
+                          mapbox_style="open-street-map",
+                          title=titulo)
+  fig.update_traces(marker=dict(size=tamanho))
+  return fig
+
+
+# Exibe um gráfico registrando o tempo de serialização e envio e, com o painel de desempenho
+# aberto, o tamanho do JSON da figura.
+# Recebe uma figura pronta ou uma função que a constrói e seus argumentos; nesse caso a figura
+# só é reconstruída quando os dados mudam (ver graficos.py)
+def mostrar_grafico(grafico, *args, **kwargs):
+  inicio = time.perf_counter()
+  figura = graficos.figura(grafico, *args, **kwargs) if callable(grafico) else graficos.preparar(grafico)
+  st.plotly_chart(figura)
+  instrumentacao.registrar_primeiro_grafico()
+  instrumentacao.registrar('grafico', figura.layout.title.text or 'sem título', time.perf_counter() - inicio,
+                           bytes_=instrumentacao.bytes_figura(figura) if st.session_state.get('painel_desempenho') else None)
+
+
+# Aviso de que os chamados exibidos são uma amostra ou foram cortados pelos limites por consulta
+# (ver fonte_bigquery.ler_em_lotes e aplicar_orcamento); contagens e mapas refletem só essa parte
+def avisar_amostra(df):
+  fracao = df.attrs.get('fracao_amostra', 1.0)
+  if fracao < 1.0:
+    st.warning(f"O resultado passou dos limites por consulta: os chamados exibidos são uma amostra de "
+               f"{fracao:.1%} do período. Reduza o intervalo de datas para ver todos.")
+  elif df.attrs.get('limitado', False):
+    st.warning("O resultado passou dos limites por consulta e foi cortado. Reduza o intervalo de datas para ver todos.")
+
+
+# Cada página é um fragmento: mudar as datas ou a seleção de uma página reexecuta só a página,
+# sem passar de novo pela barra lateral e pelo despacho entre páginas
+def fragmento_de_pagina(funcao):
+  @st.fragment
+  @functools.wraps(funcao)
+  def fragmento():
+    try:
+      funcao()
+    except fonte_bigquery.OrcamentoExcedido as erro:
+      # Consultas recusadas pelo orçamento de bytes (ver fonte_bigquery.aplicar_orcamento)
+      st.error(str(erro))
+  return fragmento
+
+
+# Posições filtradas e ordenadas da tabela de dados brutos, reaproveitadas ao trocar de página
+@st.cache_data(ttl=3600, max_entries=32)
+def get_posicoes_tabela(df, filtros, coluna, ascendente):
+  return tabela.posicoes(df, filtros, coluna, ascendente)
+
+# Tabela de dados brutos em um fragmento próprio: marcar a opção ou trocar de página não
+# reconstrói mapas e gráficos, e só a página visível é enviada ao navegador (ver tabela.py)
+@st.fragment
+def dados_brutos(df, chave):
+  if not st.checkbox("Mostrar dados brutos", key=f"{chave}_mostrar"):
+      return
+
+  col1, col2, col3, col4 = st.columns(4)
+  filtros = tuple(
+      (coluna, tuple(coluna_ui.multiselect(f"Filtrar {coluna}", sorted(df[coluna].dropna().unique()), key=f"{chave}_{coluna}")))
+      for coluna, coluna_ui in [('tipo', col1), ('status', col2)])
+  coluna = col3.selectbox("Ordenar por", df.columns, index=None, key=f"{chave}_ordem")
+  descendente = col3.checkbox("Decrescente", key=f"{chave}_descendente")
+  tamanho = col4.selectbox("Linhas por página", tabela.TAMANHOS_PAGINA, key=f"{chave}_tamanho")
+
+  posicoes = get_posicoes_tabela(df, filtros, coluna, not descendente)
+  paginas = tabela.numero_paginas(len(posicoes), tamanho)
+  numero = col4.number_input("Página", min_value=1, max_value=paginas, key=f"{chave}_pagina")
+  st.dataframe(tabela.pagina(df, posicoes, numero, tamanho), hide_index=True)
+  st.caption(f"{len(posicoes)} linhas, página {numero} de {paginas}")
+
+  # O extrato completo só é gerado quando o botão é clicado
+  col1, col2 = st.columns(2)
+  col1.download_button("Exportar CSV", lambda: tabela.exportar_csv(df, posicoes), f"{chave}.csv", 'text/csv',
+                       key=f"{chave}_csv")
+  col2.download_button("Exportar Parquet", lambda: tabela.exportar_parquet(df, posicoes), f"{chave}.parquet",
+                       'application/vnd.apache.parquet', key=f"{chave}_parquet")
 
 
+if aquecimento.ATIVO:
+  iniciar_aquecimento()
+
 # Sidebar para seleção de dashboard
 st.sidebar.title("Navegação")
 dashboard_selection = st.sidebar.radio(
   "Escolha um dashboard:",
   ["Visão Geral dos Chamados", "Análise por Bairro", "Mapa Geral de Chamados", 
-   "Tendências Temporais", "Impacto Climático", "Impacto de Eventos", "Impacto de Feriados nos Chamados"]
+   "Tendências Temporais", "Impacto Climático", "Impacto de Eventos", "Impacto de Feriados nos Chamados"],
+  key='pagina'
 )
+instrumentacao.iniciar_execucao(dashboard_selection, INICIO_SCRIPT)
 
 # Função para o dashboard de visão geral dos chamados
+@fragmento_de_pagina
 def visao_geral_chamados():
+  import plotly.express as px
   st.title("Visão Geral dos Chamados")
   
   # Seleção de intervalo de datas
@@ -192,34 +398,33 @@ def visao_geral_chamados():
   col3.metric("Chamados Fechados", chamados_fechados)
   
   # Gráfico de chamados por serviço
-  chamados_por_servico = chamados_df.groupby('servico')['contagem'].sum().nlargest(10).reset_index()
+  chamados_por_servico = chamados_df.groupby('servico', observed=True)['contagem'].sum().nlargest(10).reset_index()
   
-  fig_servico = px.bar(chamados_por_servico, x='servico', y='contagem',
-                       title='Top 10 Serviços Solicitados')
-  st.plotly_chart(fig_servico)
+  mostrar_grafico(px.bar, chamados_por_servico, x='servico', y='contagem',
+                  title='Top 10 Serviços Solicitados')
   
   # Gráfico de evolução temporal dos chamados
   chamados_por_dia = chamados_df.groupby('data')['contagem'].sum().reset_index()
   
-  fig_evolucao = px.line(chamados_por_dia, x='data', y='contagem',
-                         title='Evolução Diária dos Chamados')
-  st.plotly_chart(fig_evolucao)
+  mostrar_grafico(px.line, chamados_por_dia, x='data', y='contagem',
+                  title='Evolução Diária dos Chamados')
   
   # Gráfico de pizza para status dos chamados
-  status_chamados = chamados_df.groupby('status')['contagem'].sum().reset_index()
-  fig_status = px.pie(status_chamados, values='contagem', names='status',
-                      title='Distribuição de Status dos Chamados')
-  st.plotly_chart(fig_status)
+  status_chamados = chamados_df.groupby('status', observed=True)['contagem'].sum().reset_index()
+  mostrar_grafico(px.pie, status_chamados, values='contagem', names='status',
+                  title='Distribuição de Status dos Chamados')
 
 # Função para o dashboard de análise por bairro
+@fragmento_de_pagina
 def analise_por_bairro():
+  import plotly.express as px
   st.title("Análise por Bairro")
   
-  bairros_df = get_bairros()
+  indice = get_indice_bairros()
   
   # Seletor de bairro
-  bairro_selecionado = st.selectbox("Selecione um bairro:", bairros_df['nome'].unique())
-  bairro_id = bairros_df[bairros_df['nome'] == bairro_selecionado]['id_bairro'].iloc[0]
+  bairro_selecionado = st.selectbox("Selecione um bairro:", indice.nomes())
+  bairro_id = indice.id_bairro(bairro_selecionado)
   
   # Seleção de intervalo de datas
   col1, col2 = st.columns(2)
@@ -233,6 +438,7 @@ def analise_por_bairro():
       return
   
   chamados_bairro = get_chamados_por_bairro(bairro_id, data_inicio, data_fim)
+  avisar_amostra(chamados_bairro)
   
   # Métricas do bairro
   total_chamados_bairro = len(chamados_bairro)
@@ -244,33 +450,48 @@ def analise_por_bairro():
   
   # Gráfico de pizza para tipos de chamados no bairro
   tipos_chamados = chamados_bairro['tipo'].value_counts()
-  fig_tipos = px.pie(values=tipos_chamados.values, names=tipos_chamados.index,
-                     title=f'Distribuição de Tipos de Chamados em {bairro_selecionado}')
-  st.plotly_chart(fig_tipos)
+  tipos_chamados = tipos_chamados[tipos_chamados > 0]
+  mostrar_grafico(px.pie, values=tipos_chamados.values, names=tipos_chamados.index,
+                  title=f'Distribuição de Tipos de Chamados em {bairro_selecionado}')
   
   # Verificar se há dados de latitude e longitude válidos
   valid_coords = chamados_bairro.dropna(subset=['latitude', 'longitude'])
-  if len(valid_coords) > 0:
+  if len(valid_coords) > mapa.LIMITE_PONTOS_MAPA:
+      # Muitos pontos: agregamos localmente em grade e mostramos a densidade
+      mostrar_grafico(mapa_densidade, mapa.agregar_em_grade(valid_coords), zoom=11,
+                      titulo=f'Densidade de Chamados em {bairro_selecionado}')
+  elif len(valid_coords) > 0:
       # Mapa de pins coloridos por tipo de chamado
-      fig_mapa = px.scatter_mapbox(valid_coords, 
-                                   lat='latitude', 
-                                   lon='longitude',
-                                   color='tipo',
-                                   hover_data=['status', 'data_inicio'],
-                                   zoom=11,
-                                   mapbox_style="open-street-map",
-                                   title=f'Mapa de Chamados em {bairro_selecionado}')
-      fig_mapa.update_traces(marker=dict(size=10))
-      st.plotly_chart(fig_mapa)
+      mostrar_grafico(mapa_pontos, valid_coords, zoom=11, titulo=f'Mapa de Chamados em {bairro_selecionado}',
+                      tamanho=10)
   else:
       st.warning("Não há dados de localização disponíveis para este bairro no período selecionado.")
 
+  # Comparação entre bairros, a partir do rollup diário por bairro
+  chamados_bairros = get_chamados_bairros(data_inicio, data_fim)
+  ranking_bairros = bairros.ranking(chamados_bairros, indice, 'nome')
+  posicao = ranking_bairros.index[ranking_bairros['nome'] == bairro_selecionado]
+  if len(posicao) > 0:
+      st.write(f"{bairro_selecionado} é o {posicao[0] + 1}º bairro com mais chamados no período "
+               f"(subprefeitura {indice.subprefeitura(bairro_id)}).")
+  
+  col1, col2 = st.columns(2)
+  with col1:
+      fig_top = px.bar(ranking_bairros.head(10), x='contagem', y='nome', orientation='h',
+                       title='Top 10 Bairros com Mais Chamados')
+      fig_top.update_yaxes(autorange='reversed')
+      mostrar_grafico(fig_top)
+  with col2:
+      mostrar_grafico(px.bar, bairros.ranking(chamados_bairros, indice, 'subprefeitura'), x='subprefeitura',
+                      y='contagem', title='Chamados por Subprefeitura')
+
   # Exibir dados brutos (opcional)
-  if st.checkbox("Mostrar dados brutos"):
-      st.write(chamados_bairro)
+  dados_brutos(chamados_bairro, 'chamados_bairro')
 
 # Função para o dashboard de mapa geral de chamados
+@fragmento_de_pagina
 def mapa_geral_chamados():
+  import plotly.express as px
   st.title("Mapa Geral de Chamados")
   
   # Seleção de intervalo de datas
@@ -284,12 +505,13 @@ def mapa_geral_chamados():
       st.error("A data inicial deve ser anterior à data final.")
       return
   
-  chamados_geral = get_chamados_geral(data_inicio, data_fim)
+  chamados_geral, modo_agregado = get_chamados_mapa(data_inicio, data_fim)
+  avisar_amostra(chamados_geral)
   
   # Métricas gerais
-  total_chamados = len(chamados_geral)
-  chamados_abertos = chamados_geral[chamados_geral['status'] == 'ABERTO'].shape[0]
-  chamados_fechados = chamados_geral[chamados_geral['status'] == 'FECHADO'].shape[0]
+  total_chamados = chamados_geral['contagem'].sum()
+  chamados_abertos = chamados_geral.loc[chamados_geral['status'] == 'ABERTO', 'contagem'].sum()
+  chamados_fechados = chamados_geral.loc[chamados_geral['status'] == 'FECHADO', 'contagem'].sum()
   
   col1, col2, col3 = st.columns(3)
   col1.metric("Total de Chamados", total_chamados)
@@ -297,33 +519,29 @@ def mapa_geral_chamados():
   col3.metric("Chamados Fechados", chamados_fechados)
   
   # Gráfico de pizza para tipos de chamados
-  tipos_chamados = chamados_geral['tipo'].value_counts().nlargest(10)
-  fig_tipos = px.pie(values=tipos_chamados.values, names=tipos_chamados.index,
-                     title='Top 10 Tipos de Chamados')
-  st.plotly_chart(fig_tipos)
+  tipos_chamados = chamados_geral.groupby('tipo', observed=True)['contagem'].sum().nlargest(10)
+  mostrar_grafico(px.pie, values=tipos_chamados.values, names=tipos_chamados.index,
+                  title='Top 10 Tipos de Chamados')
   
   # Mapa de pins coloridos por tipo de chamado
-  if not chamados_geral.empty:
-      fig_mapa = px.scatter_mapbox(chamados_geral, 
-                                   lat='latitude', 
-                                   lon='longitude',
-                                   color='tipo',
-                                   hover_data=['status', 'data_inicio'],
-                                   zoom=10,
-                                   mapbox_style="open-street-map",
-                                   title='Mapa Geral de Chamados')
-      fig_mapa.update_traces(marker=dict(size=5))  # Reduzimos o tamanho dos marcadores devido à maior quantidade de pontos
-      st.plotly_chart(fig_mapa)
-  else:
+  if chamados_geral.empty:
       st.warning("Não há dados de localização disponíveis para o período selecionado.")
+  elif modo_agregado:
+      mostrar_grafico(mapa_densidade, chamados_geral, zoom=10, titulo='Densidade de Chamados')
+      st.caption(f"Acima de {mapa.LIMITE_PONTOS_MAPA} chamados o mapa mostra a densidade em células de "
+                 f"{mapa.TAMANHO_CELULA}° em vez de um ponto por chamado.")
+  else:
+      # Marcadores menores devido à maior quantidade de pontos
+      mostrar_grafico(mapa_pontos, chamados_geral, zoom=10, titulo='Mapa Geral de Chamados', tamanho=5)
 
   # Exibir dados brutos (opcional)
-  if st.checkbox("Mostrar dados brutos"):
-      st.write(chamados_geral)
+  dados_brutos(chamados_geral, 'chamados_geral')
 
 
 # Função para o dashboard de impacto de eventos
+@fragmento_de_pagina
 def impacto_eventos():
+  import plotly.express as px
   st.title("Impacto de Eventos na Cidade")
   
   eventos_df = get_eventos()
@@ -340,46 +558,47 @@ def impacto_eventos():
   # Definindo períodos para análise
   data_inicial = evento_dados['data_inicial']
   data_final = evento_dados['data_final']
-  dias_antes = (data_inicial - timedelta(days=7)).strftime('%Y-%m-%d')
-  dias_depois = (data_final + timedelta(days=7)).strftime('%Y-%m-%d')
+  dias_antes = (data_inicial - timedelta(days=DIAS_JANELA_EVENTO)).strftime('%Y-%m-%d')
+  dias_depois = (data_final + timedelta(days=DIAS_JANELA_EVENTO)).strftime('%Y-%m-%d')
   
-  # Obtendo dados climáticos
-  clima_dados = get_weather_data(dias_antes, dias_depois)
+  # Dados climáticos da janela e chamados de todos os eventos (pré-calculados em lote)
+  clima_dados, chamados_eventos = carregar_em_paralelo(
+    (get_weather_data, dias_antes, dias_depois),
+    (get_chamados_eventos,),
+  )
   clima_dados['data'] = pd.to_datetime(clima_dados['data'])
-  
-  # Chamados durante o evento
-  chamados_evento = get_chamados_por_periodo(data_inicial, data_final)
-  chamados_antes = get_chamados_por_periodo(dias_antes, data_inicial)
-  chamados_depois = get_chamados_por_periodo(data_final, dias_depois)
+
+  # Filtro opcional por tipo de chamado (por exemplo, Perturbação do sossego), aplicado localmente
+  tipo_selecionado = st.selectbox("Tipo de chamado:", ["Todos", *sorted(chamados_eventos['tipo'].dropna().unique())])
+  if tipo_selecionado != "Todos":
+      chamados_eventos = chamados_eventos[chamados_eventos['tipo'] == tipo_selecionado]
+  chamados_janela = chamados_eventos[chamados_eventos['id_evento'] == evento_dados.name]
+  chamados_evento = chamados_janela[chamados_janela['periodo'] == 'Durante']
   
   # Gráfico de barras para categorias de chamados durante o evento
-  if 'tipo' in chamados_evento.columns and 'contagem' in chamados_evento.columns:
-      chamados_evento_total = chamados_evento.groupby('tipo')['contagem'].sum().reset_index()
+  if not chamados_evento.empty:
+      chamados_evento_total = chamados_evento.groupby('tipo', observed=True)['contagem'].sum().reset_index()
       fig_categorias_evento = px.bar(chamados_evento_total.nlargest(10, 'contagem'), x='tipo', y='contagem',
                                      title=f'Top 10 Categorias de Chamados Durante {evento_selecionado}')
-      st.plotly_chart(fig_categorias_evento)
+      mostrar_grafico(fig_categorias_evento)
   else:
       st.warning("Dados insuficientes para gerar o gráfico de categorias de chamados.")
   
-  # Comparação de chamados antes, durante e depois do evento
-  chamados_antes_total = chamados_antes['contagem'].sum() if 'contagem' in chamados_antes.columns else 0
-  chamados_evento_total = chamados_evento['contagem'].sum() if 'contagem' in chamados_evento.columns else 0
-  chamados_depois_total = chamados_depois['contagem'].sum() if 'contagem' in chamados_depois.columns else 0
-  
+  # Comparação de chamados antes, durante e depois do evento (períodos sem chamados aparecem com zero)
+  chamados_por_periodo = chamados_janela.groupby('periodo', observed=False)['contagem'].sum()
   comparacao_df = pd.DataFrame({
-      'Período': ['Antes', 'Durante', 'Depois'],
-      'Chamados': [chamados_antes_total, chamados_evento_total, chamados_depois_total]
+      'Período': chamados_por_periodo.index.astype(str),
+      'Chamados': chamados_por_periodo.values
   })
   
   fig_comparacao = px.bar(comparacao_df, x='Período', y='Chamados',
                           title=f'Comparação de Chamados: Antes, Durante e Depois de {evento_selecionado}')
-  st.plotly_chart(fig_comparacao)
+  mostrar_grafico(fig_comparacao)
   
   # Gráfico de linha: Evolução dos chamados e temperatura durante o evento
-  chamados_diarios = pd.concat([chamados_antes, chamados_evento, chamados_depois])
+  chamados_diarios = chamados_janela
   
-  if 'data' in chamados_diarios.columns:
-      chamados_diarios['data'] = pd.to_datetime(chamados_diarios['data'])
+  if not chamados_diarios.empty:
       chamados_diarios = chamados_diarios.groupby('data')['contagem'].sum().reset_index()
       
       clima_chamados = pd.merge(clima_dados, chamados_diarios, on='data', how='left')
@@ -419,7 +638,7 @@ def impacto_eventos():
           layer="below", line_width=0,
       )
       
-      st.plotly_chart(fig_evolucao)
+      mostrar_grafico(fig_evolucao)
       
       # Análise de correlação entre chamados e clima durante o evento
       correlacao_temp = clima_chamados['contagem'].corr(clima_chamados['temperatura_media'])
@@ -430,11 +649,17 @@ def impacto_eventos():
       col1.metric("Correlação Chamados vs. Temperatura", f"{correlacao_temp:.2f}")
       col2.metric("Correlação Chamados vs. Precipitação", f"{correlacao_precip:.2f}")
   else:
-      st.warning("A coluna 'data' não está presente nos dados de chamados. Verifique a função get_chamados_por_periodo().")
+      st.warning("Não há chamados registrados na janela do evento selecionado.")
+
+  # Todos os eventos lado a lado: chamados antes, durante e depois e média diária durante o evento
+  st.subheader("Comparação entre Eventos")
+  st.dataframe(intervalos.resumo_eventos(chamados_eventos, eventos_df), hide_index=True)
 
 
 # Dashboard de tendências temporais
+@fragmento_de_pagina
 def dashboard_tendencias_temporais():
+  import plotly.express as px
   st.title("Dashboard de Tendências Temporais")
   
   # Seleção de intervalo de datas
@@ -452,12 +677,11 @@ def dashboard_tendencias_temporais():
   
   # 1. Gráfico de linha mostrando a evolução dos chamados ao longo do tempo
   chamados_diarios = chamados_tendencias.groupby('data')['contagem'].sum().reset_index()
-  fig_evolucao = px.line(chamados_diarios, x='data', y='contagem',
-                         title='Evolução Diária dos Chamados')
-  st.plotly_chart(fig_evolucao)
+  mostrar_grafico(px.line, chamados_diarios, x='data', y='contagem',
+                  title='Evolução Diária dos Chamados')
   
   # 2. Heatmap dos chamados por hora do dia e dia da semana
-  heatmap_data = chamados_tendencias.groupby(['dia_semana', 'hora'])['contagem'].sum().reset_index()
+  heatmap_data = get_chamados_por_hora(data_inicio, data_fim).groupby(['dia_semana', 'hora'])['contagem'].sum().reset_index()
   heatmap_data = heatmap_data.pivot(index='dia_semana', columns='hora', values='contagem')
   
   dias_semana = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
@@ -474,28 +698,28 @@ def dashboard_tendencias_temporais():
       xaxis_title='Hora do Dia',
       yaxis_title='Dia da Semana'
   )
-  st.plotly_chart(fig_heatmap)
+  mostrar_grafico(fig_heatmap)
   
   # 3. Análise mensal dos tipos de chamados
-  chamados_mensais = chamados_tendencias.groupby(['mes', 'tipo'])['contagem'].sum().reset_index()
-  top_tipos = chamados_mensais.groupby('tipo')['contagem'].sum().nlargest(5).index
+  chamados_mensais = chamados_tendencias.groupby(['mes', 'tipo'], observed=True)['contagem'].sum().reset_index()
+  top_tipos = chamados_mensais.groupby('tipo', observed=True)['contagem'].sum().nlargest(5).index
   chamados_mensais_top = chamados_mensais[chamados_mensais['tipo'].isin(top_tipos)]
   
   chamados_mensais_top['mes'] = chamados_mensais_top['mes'].apply(lambda x: calendar.month_abbr[x])
   
-  fig_mensal = px.line(chamados_mensais_top, x='mes', y='contagem', color='tipo',
-                       title='Tendência Mensal dos Top 5 Tipos de Chamados')
-  fig_mensal.update_xaxes(categoryorder='array', categoryarray=list(calendar.month_abbr)[1:])
-  st.plotly_chart(fig_mensal)
+  mostrar_grafico(px.line, chamados_mensais_top, x='mes', y='contagem', color='tipo',
+                  category_orders={'mes': list(calendar.month_abbr)[1:]},
+                  title='Tendência Mensal dos Top 5 Tipos de Chamados')
   
   # 4. Distribuição dos tipos de chamados
-  tipos_chamados = chamados_tendencias.groupby('tipo')['contagem'].sum().nlargest(10).reset_index()
-  fig_tipos = px.pie(tipos_chamados, values='contagem', names='tipo',
-                     title='Top 10 Tipos de Chamados')
-  st.plotly_chart(fig_tipos)
+  tipos_chamados = chamados_tendencias.groupby('tipo', observed=True)['contagem'].sum().nlargest(10).reset_index()
+  mostrar_grafico(px.pie, tipos_chamados, values='contagem', names='tipo',
+                  title='Top 10 Tipos de Chamados')
 
 
+@fragmento_de_pagina
 def dashboard_impacto_climatico():
+  import plotly.express as px
   st.title("Dashboard de Impacto Climático")
   
   col1, col2 = st.columns(2)
@@ -508,15 +732,11 @@ def dashboard_impacto_climatico():
       st.error("A data inicial deve ser anterior à data final.")
       return
   
-  chamados = get_chamados(data_inicio, data_fim)
-  clima = get_weather_data(data_inicio, data_fim)
-  
-  chamados_clima = pd.merge(chamados, clima, on='data')
-  chamados_diarios = chamados_clima.groupby('data').agg({
-    'contagem_chamados': 'sum',
-    'temperatura_media': 'mean',
-    'precipitacao': 'mean'
-  }).reset_index()
+  impacto = get_impacto_climatico(data_inicio, data_fim)
+  chamados_diarios = impacto['diarios']
+  if chamados_diarios.empty:
+      st.warning("Não há dados de clima para o período selecionado.")
+      return
   
   fig_temp = go.Figure()
   fig_temp.add_trace(go.Scatter(x=chamados_diarios['data'], y=chamados_diarios['contagem_chamados'],
@@ -534,7 +754,7 @@ def dashboard_impacto_climatico():
         side='right'
     )
   )
-  st.plotly_chart(fig_temp)
+  mostrar_grafico(fig_temp)
   
   # Gráfico de Chamados vs. Precipitação
   dias_com_chuva = chamados_diarios[chamados_diarios['precipitacao'] > 0]
@@ -557,73 +777,55 @@ def dashboard_impacto_climatico():
       xaxis_title='Precipitação (mm)',
       yaxis_title='Número de Chamados'
   )
-  st.plotly_chart(fig_precip)
+  mostrar_grafico(fig_precip)
   
   # Categorização da precipitação
-  def categorizar_precipitacao(valor):
-      if valor == 0:
-          return 'Sem chuva'
-      elif valor <= 5:
-          return 'Chuva leve'
-      elif valor <= 25:
-          return 'Chuva moderada'
-      else:
-          return 'Chuva forte'
-
-  chamados_diarios['categoria_precipitacao'] = chamados_diarios['precipitacao'].apply(categorizar_precipitacao)
-  media_por_categoria = chamados_diarios.groupby('categoria_precipitacao')['contagem_chamados'].mean().reset_index()
-
-  fig_categoria = px.bar(media_por_categoria, x='categoria_precipitacao', y='contagem_chamados',
-                         title='Média de Chamados por Categoria de Precipitação')
-  st.plotly_chart(fig_categoria)
+  media_por_categoria = impacto['media_por_categoria']
+
+  mostrar_grafico(px.bar, media_por_categoria, x='categoria_precipitacao', y='contagem_chamados',
+                  title='Média de Chamados por Categoria de Precipitação')
   
   # Create the heatmap
-  chamados_temp = chamados_clima.groupby(['tipo', pd.cut(chamados_clima['temperatura_media'], bins=5)])['contagem_chamados'].mean().unstack()
-  chamados_temp.columns = chamados_temp.columns.astype(str)
-  chamados_temp = chamados_temp.fillna(0)
-
-  fig_heatmap = px.imshow(
-      chamados_temp,
+  mostrar_grafico(
+      px.imshow,
+      impacto['tipo_temperatura'],
       labels=dict(x="Faixa de Temperatura", y="Tipo de Chamado", color="Média de Chamados"),
       title="Heatmap: Tipos de Chamados vs. Temperatura"
   )
   
-  # Display the heatmap
-  st.plotly_chart(fig_heatmap)
-  
-  dias_chuvosos = chamados_clima[chamados_clima['precipitacao'] > 10]
-  top_tipos_chuva = dias_chuvosos.groupby('tipo')['contagem_chamados'].sum().nlargest(5).reset_index()
-  
-  fig_top_chuva = px.bar(top_tipos_chuva, x='tipo', y='contagem_chamados',
-                         title='Top 5 Tipos de Chamados em Dias Chuvosos')
-  st.plotly_chart(fig_top_chuva)
+  mostrar_grafico(px.bar, impacto['top_tipos_chuva'], x='tipo', y='contagem_chamados',
+                  title='Top 5 Tipos de Chamados em Dias Chuvosos')
 
 
+@fragmento_de_pagina
 def dashboard_impacto_feriados():
+  import plotly.express as px
   st.title("Impacto de Feriados nos Chamados")
   
   # Seleção de ano
-  year = st.selectbox("Selecione o ano", range(2020, datetime.now().year + 1))
+  year = st.selectbox("Selecione o ano", anos_feriados())
   
-  # Obter feriados e chamados
-  holidays = get_holidays(year)
-  chamados = get_chamados(f"{year}-01-01", f"{year}-12-31")
+  # Obter o calendário do ano e os chamados
+  calendario_ano, chamados = carregar_em_paralelo(
+    (get_calendario, f"{year}-01-01", f"{year}-12-31"),
+    (get_chamados, f"{year}-01-01", f"{year}-12-31"),
+  )
   
-  # Processar dados
-  chamados['is_holiday'] = chamados['data'].isin(holidays['date'])
+  # Processar dados: os chamados diários recebem o feriado do dia pelo índice do calendário
+  chamados = calendario.juntar(chamados, calendario_ano, colunas=('feriado', 'e_feriado'))
+  chamados = chamados.rename(columns={'e_feriado': 'is_holiday'})
   
   # 1. Comparação de volume de chamados: feriados vs. dias normais
   volume_comparison = chamados.groupby('is_holiday')['contagem_chamados'].mean().reset_index()
   volume_comparison['is_holiday'] = volume_comparison['is_holiday'].map({True: 'Feriados', False: 'Dias Normais'})
   
-  fig_volume = px.bar(volume_comparison, x='is_holiday', y='contagem_chamados',
-                      title='Média de Chamados: Feriados vs. Dias Normais',
-                      labels={'is_holiday': 'Tipo de Dia', 'contagem_chamados': 'Média de Chamados'})
-  st.plotly_chart(fig_volume)
+  mostrar_grafico(px.bar, volume_comparison, x='is_holiday', y='contagem_chamados',
+                  title='Média de Chamados: Feriados vs. Dias Normais',
+                  labels={'is_holiday': 'Tipo de Dia', 'contagem_chamados': 'Média de Chamados'})
   
   # 2. Top 10 tipos de chamados em feriados vs. dias normais (usando média diária)
-  top_tipos_feriados = chamados[chamados['is_holiday']].groupby('tipo')['contagem_chamados'].mean().nlargest(10)
-  top_tipos_normais = chamados[~chamados['is_holiday']].groupby('tipo')['contagem_chamados'].mean().nlargest(10)
+  top_tipos_feriados = chamados[chamados['is_holiday']].groupby('tipo', observed=True)['contagem_chamados'].mean().nlargest(10)
+  top_tipos_normais = chamados[~chamados['is_holiday']].groupby('tipo', observed=True)['contagem_chamados'].mean().nlargest(10)
 
   fig_tipos = go.Figure()
   fig_tipos.add_trace(go.Bar(x=top_tipos_feriados.index, y=top_tipos_feriados.values, name='Feriados'))
@@ -634,21 +836,26 @@ def dashboard_impacto_feriados():
     yaxis_title='Média Diária de Chamados',
     barmode='group'
   )
-  st.plotly_chart(fig_tipos)
+  mostrar_grafico(fig_tipos)
   
   # 3. Análise de tipos de chamados mais comuns em feriados específicos
   st.subheader("Tipos de Chamados Mais Comuns em Feriados Específicos")
-  for _, holiday in holidays.iterrows():
-      holiday_calls = chamados[chamados['data'] == holiday['date']]
-      if not holiday_calls.empty:
-          top_types = holiday_calls.groupby('tipo')['contagem_chamados'].sum().nlargest(5)
-          st.write(f"**{holiday['localName']} ({holiday['date']}):**")
-          st.write(top_types)
-          st.write("---")
-  
-  # 4. Gráfico de linha: Evolução dos chamados ao longo do ano, destacando feriados
-  chamados_diarios = chamados.groupby('data')['contagem_chamados'].sum().reset_index()
-  chamados_diarios['is_holiday'] = chamados_diarios['data'].isin(holidays['date'])
+  top_por_feriado = (chamados[chamados['is_holiday']]
+                     .groupby(['data', 'feriado', 'tipo'], observed=True)['contagem_chamados'].sum()
+                     .sort_values(ascending=False)
+                     .groupby(level=['data', 'feriado']).head(5))
+  for (data, feriado), top_types in top_por_feriado.groupby(level=['data', 'feriado']):
+      st.write(f"**{feriado} ({data:%Y-%m-%d}):**")
+      st.write(top_types.droplevel(['data', 'feriado']))
+      st.write("---")
+  
+  # 4. Clima em cada feriado e se o dia foi aproveitável para praia (ver calendario.py)
+  st.subheader("Clima nos Feriados")
+  st.dataframe(calendario.tempo_feriados(calendario_ano)[['feriado', 'temperatura_media', 'precipitacao', 'tempo',
+                                                          'dia_de_praia', 'pontuacao_praia']])
+  
+  # 5. Gráfico de linha: Evolução dos chamados ao longo do ano, destacando feriados
+  chamados_diarios = chamados.groupby(['data', 'is_holiday'], as_index=False)['contagem_chamados'].sum()
   
   fig_evolucao = px.line(chamados_diarios, x='data', y='contagem_chamados',
                          title='Evolução dos Chamados ao Longo do Ano')
@@ -657,7 +864,7 @@ def dashboard_impacto_feriados():
                                     mode='markers',
                                     name='Feriados',
                                     marker=dict(size=10, color='red')))
-  st.plotly_chart(fig_evolucao)
+  mostrar_grafico(fig_evolucao)
 
 # Renderizando o dashboard selecionado
 if dashboard_selection == "Visão Geral dos Chamados":
@@ -673,4 +880,21 @@ elif dashboard_selection == "Impacto Climático":
 elif dashboard_selection == "Impacto de Eventos":
   impacto_eventos()
 elif dashboard_selection == "Impacto de Feriados nos Chamados":
-  dashboard_impacto_feriados()
\ No newline at end of file
+  dashboard_impacto_feriados()
+
+# Painel de depuração com o custo da execução atual da página (ver instrumentacao.py)
+if instrumentacao.ATIVA and st.sidebar.checkbox("Painel de desempenho", key='painel_desempenho'):
+  eventos = instrumentacao.eventos_da_execucao()
+  with st.sidebar:
+    if eventos.empty:
+      st.write("Nenhuma medição nesta execução.")
+    else:
+      com_cache = eventos[(eventos['categoria'] != 'bigquery') & eventos['cache'].notna()]
+      primeiro_grafico = eventos.loc[eventos['nome'] == 'primeiro_grafico', 'segundos']
+      col1, col2, col3 = st.columns(3)
+      col1.metric("Tempo da página (s)", f"{instrumentacao.duracao_execucao():.2f}")
+      col2.metric("Primeiro gráfico (s)", f"{primeiro_grafico.iloc[0]:.2f}" if len(primeiro_grafico) else "-")
+      col3.metric("Acertos de cache", f"{(com_cache['cache'] == 'acerto').mean():.0%}" if len(com_cache) else "-")
+      st.dataframe(instrumentacao.resumo(eventos), hide_index=True)
+      st.download_button("Métricas (Prometheus)", instrumentacao.exportar_prometheus(), 'metricas.prom', 'text/plain')
+      st.download_button("Eventos (JSON)", instrumentacao.exportar_json(), 'eventos.jsonl', 'application/x-ndjson')
@@ -0,0 +1,62 @@
+import os
+import threading
+from datetime import date
+
+import pandas as pd
+
+import instrumentacao
+from armazem import DIRETORIO_DADOS
+from clima import TIMEOUT, sessao
+
+# Calendário de feriados nacionais (date.nager.at) guardado em disco para vários anos.
+# É carregado uma vez e só busca na API os anos que ainda não estão no arquivo.
+
+NAGER_URL = os.environ.get('NAGER_URL', 'https://date.nager.at/api/v3/PublicHolidays')
+PAIS = 'BR'
+ARQUIVO_FERIADOS = os.path.join(DIRETORIO_DADOS, 'feriados.parquet')
+PRIMEIRO_ANO = int(os.environ.get('PRIMEIRO_ANO_FERIADOS', '2020'))
+COLUNAS = ['date', 'localName', 'name', 'ano']
+
+_lock = threading.Lock()
+
+
+def ler_arquivo():
+  if not os.path.exists(ARQUIVO_FERIADOS):
+    return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'localName': pd.Series(dtype='object'),
+                         'name': pd.Series(dtype='object'), 'ano': pd.Series(dtype='int64')})
+  return pd.read_parquet(ARQUIVO_FERIADOS)
+
+
+def salvar_arquivo(df):
+  os.makedirs(os.path.dirname(ARQUIVO_FERIADOS), exist_ok=True)
+  temporario = f"{ARQUIVO_FERIADOS}.{os.getpid()}.{threading.get_ident()}.tmp"
+  df.sort_values('date').to_parquet(temporario, index=False)
+  os.replace(temporario, ARQUIVO_FERIADOS)
+
+
+@instrumentacao.medido('http')
+def buscar_api(ano):
+  resposta = sessao().get(f"{NAGER_URL}/{ano}/{PAIS}", timeout=TIMEOUT)
+  resposta.raise_for_status()
+  df = pd.DataFrame(resposta.json())
+  df['date'] = pd.to_datetime(df['date'])
+  df['ano'] = ano
+  return df[COLUNAS]
+
+
+def carregar(anos=None):
+  anos = list(anos or range(PRIMEIRO_ANO, date.today().year + 1))
+  with _lock:
+    df = ler_arquivo()
+    faltantes = sorted(set(anos) - set(df['ano']))
+    if faltantes:
+      df = pd.concat([df, *[buscar_api(ano) for ano in faltantes]], ignore_index=True)
+      salvar_arquivo(df)
+  return df[df['ano'].isin(anos)].reset_index(drop=True)
+
+
+# Uma linha por data, juntando os nomes quando duas celebrações caem no mesmo dia
+def por_data(feriados):
+  return (feriados.groupby('date', as_index=False)['localName']
+          .agg(' / '.join)
+          .rename(columns={'date': 'data', 'localName': 'feriado'}))
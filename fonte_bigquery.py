@@ -0,0 +1,171 @@
+import logging
+import os
+import time
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import consultas
+import instrumentacao
+
+# Leitura de resultados do BigQuery em lotes, com orçamento de linhas e de memória por consulta.
+# Cada lote já é compactado (categorias para textos repetidos, float32 para coordenadas) antes de
+# ser acumulado, então o pico de memória por sessão não cresce com o tamanho do resultado.
+# O cliente do BigQuery só é importado na primeira consulta: com os caches quentes, uma réplica
+# nova não paga essa importação antes de exibir a primeira página.
+
+logger = logging.getLogger(__name__)
+
+MAX_LINHAS = int(os.environ.get('MAX_LINHAS_CONSULTA', '2000000'))
+MAX_MEMORIA_MB = int(os.environ.get('MAX_MEMORIA_CONSULTA_MB', '256'))
+TAMANHO_LOTE = int(os.environ.get('TAMANHO_LOTE_CONSULTA', '50000'))
+# 'amostrar' mantém uma amostra uniforme do resultado inteiro; 'parar' descarta o restante.
+# Só vale para as consultas de linhas brutas (consultas.amostravel): em agregados, amostrar ou cortar
+# reduziria contagens e somas sem aviso, então um agregado acima do limite é recusado
+ESTRATEGIA_LIMITE = os.environ.get('ESTRATEGIA_LIMITE_CONSULTA', 'amostrar')
+
+# Orçamento de bytes por consulta, verificado com um dry-run antes de cada execução.
+# Acima dele, consultas de linhas brutas são amostradas com TABLESAMPLE e as demais são recusadas.
+MAX_BYTES_CONSULTA = int(float(os.environ.get('MAX_GB_CONSULTA', '20')) * 1024 ** 3)
+ESTRATEGIA_ORCAMENTO = os.environ.get('ESTRATEGIA_ORCAMENTO', 'amostrar')
+# Com BIGQUERY_LOCAL=1 as consultas vão para o substituto local de bigquery_local.py
+BIGQUERY_LOCAL = os.environ.get('BIGQUERY_LOCAL') == '1'
+
+COLUNAS_CATEGORICAS = ('tipo', 'subtipo', 'status', 'servico')
+COLUNAS_FLOAT32 = ('latitude', 'longitude')
+
+ESCOPOS = ['https://www.googleapis.com/auth/cloud-platform']
+
+_clientes = {}
+
+
+class OrcamentoExcedido(Exception):
+  pass
+
+
+class ResultadoExcedido(OrcamentoExcedido):
+  pass
+
+
+def cliente(billing_project_id):
+  if billing_project_id not in _clientes and BIGQUERY_LOCAL:
+    from bigquery_local import ClienteLocal
+    _clientes[billing_project_id] = ClienteLocal()
+  if billing_project_id not in _clientes:
+    import pydata_google_auth
+    from google.cloud import bigquery
+    credenciais, _ = pydata_google_auth.default(ESCOPOS)
+    _clientes[billing_project_id] = bigquery.Client(project=billing_project_id, credentials=credenciais)
+  return _clientes[billing_project_id]
+
+
+def compactar_lote(df):
+  for coluna in COLUNAS_CATEGORICAS:
+    if coluna in df.columns:
+      df[coluna] = df[coluna].astype('category')
+  for coluna in COLUNAS_FLOAT32:
+    if coluna in df.columns:
+      df[coluna] = df[coluna].astype('float32')
+  return df
+
+
+def concatenar_lotes(lotes):
+  df = pd.concat(lotes, ignore_index=True)
+  for coluna in COLUNAS_CATEGORICAS:
+    if coluna in df.columns and df[coluna].dtype != 'category':
+      # Lotes com categorias diferentes voltam como object no concat; unimos as categorias sem copiar textos
+      df[coluna] = pd.Categorical(union_categoricals([lote[coluna] for lote in lotes]))
+  return df
+
+
+def memoria(df):
+  return int(df.memory_usage(deep=True).sum())
+
+
+def ler_em_lotes(linhas, max_linhas=MAX_LINHAS, max_memoria_mb=MAX_MEMORIA_MB, estrategia=ESTRATEGIA_LIMITE):
+  limite_bytes = max_memoria_mb * 1024 * 1024
+  lotes, total_linhas, total_bytes = [], 0, 0
+  # Fração de linhas mantida de cada lote; é reduzida pela metade sempre que o orçamento estoura
+  fracao = 1.0
+  limitado = False
+  for lote in linhas:
+    lote = compactar_lote(lote)
+    if fracao < 1.0:
+      lote = lote.sample(frac=fracao, random_state=len(lotes))
+    lotes.append(lote)
+    total_linhas += len(lote)
+    total_bytes += memoria(lote)
+    if total_linhas <= max_linhas and total_bytes <= limite_bytes:
+      continue
+
+    limitado = True
+    if estrategia == 'recusar':
+      raise ResultadoExcedido(
+        f"O resultado passa do limite de {max_linhas} linhas e {max_memoria_mb} MB por consulta. "
+        "Reduza o intervalo de datas.")
+    if estrategia != 'amostrar':
+      excesso = max(total_linhas - max_linhas, 0)
+      lotes[-1] = lote.iloc[:len(lote) - excesso]
+      total_linhas -= excesso
+      break
+    while total_linhas > max_linhas or total_bytes > limite_bytes:
+      fracao /= 2
+      lotes = [lote.sample(frac=0.5, random_state=i) for i, lote in enumerate(lotes)]
+      total_linhas = sum(len(lote) for lote in lotes)
+      total_bytes = sum(memoria(lote) for lote in lotes)
+
+  if limitado:
+    logger.warning("Resultado limitado (%s): %d linhas, %.1f MB, fração mantida %.4f",
+                   estrategia, total_linhas, total_bytes / 1024 / 1024, fracao)
+  df = concatenar_lotes(lotes) if lotes else pd.DataFrame()
+  df.attrs['fracao_amostra'] = fracao
+  df.attrs['limitado'] = limitado
+  return df
+
+
+def configuracao(parametros):
+  from google.cloud import bigquery
+  return bigquery.QueryJobConfig(query_parameters=[
+    bigquery.ScalarQueryParameter(nome, tipo, valor) for nome, tipo, valor in parametros
+  ])
+
+
+def estimar_bytes(query, billing_project_id, parametros=()):
+  config = configuracao(parametros)
+  config.dry_run = True
+  config.use_query_cache = False
+  return cliente(billing_project_id).query(query, job_config=config).total_bytes_processed
+
+
+# Dry-run da consulta; devolve o SQL a executar e a fração da tabela que ele lê
+def aplicar_orcamento(query, billing_project_id, parametros=(), max_bytes=MAX_BYTES_CONSULTA):
+  estimado = estimar_bytes(query, billing_project_id, parametros)
+  if estimado <= max_bytes:
+    return query, 1.0
+  gb_estimado, gb_limite = estimado / 1024 ** 3, max_bytes / 1024 ** 3
+  if ESTRATEGIA_ORCAMENTO == 'amostrar' and consultas.amostravel(query):
+    porcentagem = max(100 * max_bytes / estimado, 0.001)
+    logger.warning("Consulta estimada em %.1f GB (limite %.1f GB); amostrando %.3f%% da tabela",
+                   gb_estimado, gb_limite, porcentagem)
+    return consultas.com_amostra(query, porcentagem), porcentagem / 100
+  raise OrcamentoExcedido(
+    f"A consulta processaria {gb_estimado:.1f} GB, acima do limite de {gb_limite:.1f} GB por consulta. "
+    "Reduza o intervalo de datas.")
+
+
+def executar(query, billing_project_id, parametros=(), **limites):
+  inicio = time.perf_counter()
+  if not consultas.amostravel(query):
+    limites['estrategia'] = 'recusar'
+  query, fracao_tabela = aplicar_orcamento(query, billing_project_id, parametros)
+  job = cliente(billing_project_id).query(query, job_config=configuracao(parametros))
+  resultado = job.result(page_size=TAMANHO_LOTE)
+  logger.info("Job %s: %s bytes processados, cache do BigQuery: %s",
+              job.job_id, job.total_bytes_processed, 'acerto' if job.cache_hit else 'falha')
+  df = ler_em_lotes(resultado.to_dataframe_iterable(), **limites)
+  if df.empty and not len(df.columns):
+    df = pd.DataFrame(columns=[campo.name for campo in resultado.schema])
+  df.attrs['fracao_amostra'] = df.attrs.get('fracao_amostra', 1.0) * fracao_tabela
+  instrumentacao.registrar('bigquery', consultas.nome_modelo(query), time.perf_counter() - inicio, len(df),
+                           job.total_bytes_processed, 'acerto' if job.cache_hit else 'falha')
+  return df
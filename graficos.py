@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Camada de renderização dos gráficos: reduz o JSON enviado ao navegador e evita reconstruir
+# figuras cujos dados não mudaram entre execuções do script.
+# - séries de linha acima de LIMITE_PONTOS_SERIE pontos são reduzidas com LTTB
+#   (Largest-Triangle-Three-Buckets), que preserva picos e vales;
+# - traces de dispersão acima de LIMITE_PONTOS_WEBGL viram Scattergl (desenhados em WebGL);
+# - floats dos traces são arredondados para CASAS_DECIMAIS_GRAFICO casas e datas sem hora
+#   vão sem o horário;
+# - figuras prontas ficam em um cache LRU indexado pela impressão digital dos dados.
+
+LIMITE_PONTOS_SERIE = int(os.environ.get('LIMITE_PONTOS_SERIE', '2000'))
+LIMITE_PONTOS_WEBGL = int(os.environ.get('LIMITE_PONTOS_WEBGL', '5000'))
+CASAS_DECIMAIS = int(os.environ.get('CASAS_DECIMAIS_GRAFICO', '5'))
+MAX_FIGURAS = int(os.environ.get('MAX_FIGURAS_CACHE', '128'))
+
+# Atributos com um valor por ponto, recortados junto com x e y na redução
+ATRIBUTOS_POR_PONTO = ('x', 'y', 'text', 'hovertext', 'customdata', 'ids')
+ATRIBUTOS_NUMERICOS = ('x', 'y', 'z', 'lat', 'lon')
+
+_figuras = OrderedDict()
+_lock = threading.Lock()
+
+
+# Índices dos pontos mantidos pelo LTTB: o primeiro, o último e, em cada balde intermediário,
+# o ponto que forma o maior triângulo com o ponto escolhido antes e a média do balde seguinte
+def lttb(x, y, limite):
+  n = len(x)
+  if limite >= n or limite < 3:
+    return np.arange(n)
+  bordas = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+  indices = np.empty(limite, dtype=np.int64)
+  indices[0], indices[-1] = 0, n - 1
+  anterior = 0
+  for balde in range(limite - 2):
+    inicio, fim = bordas[balde], bordas[balde + 1]
+    fim_seguinte = bordas[balde + 2] if balde + 2 < len(bordas) else n
+    media_x = x[fim:fim_seguinte].mean()
+    media_y = np.nanmean(y[fim:fim_seguinte]) if np.isfinite(y[fim:fim_seguinte]).any() else y[anterior]
+    area = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                  - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+    anterior = inicio + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+    indices[balde + 1] = anterior
+  return indices
+
+
+# Eixo x como números para o cálculo das áreas: datas viram nanossegundos, categorias viram posições
+def eixo_numerico(valores):
+  valores = np.asarray(valores)
+  if valores.dtype.kind in 'iuf':
+    return valores.astype('float64')
+  if valores.dtype.kind == 'M':
+    return valores.astype('datetime64[ns]').astype('int64').astype('float64')
+  try:
+    return pd.to_datetime(valores).asi8.astype('float64')
+  except (TypeError, ValueError):
+    return np.arange(len(valores), dtype='float64')
+
+
+def eh_linha(trace):
+  return trace.type in ('scatter', 'scattergl') and (trace.mode is None or 'lines' in trace.mode)
+
+
+def reduzir_serie(trace, limite=LIMITE_PONTOS_SERIE):
+  if not eh_linha(trace) or trace.x is None or trace.y is None or len(trace.x) <= limite:
+    return
+  y = np.asarray(trace.y, dtype='float64')
+  indices = lttb(eixo_numerico(trace.x), y, limite)
+  for atributo in ATRIBUTOS_POR_PONTO:
+    valores = getattr(trace, atributo)
+    if valores is not None and not isinstance(valores, str) and len(valores) == len(y):
+      trace[atributo] = np.asarray(valores)[indices]
+
+
+def arredondar(trace, casas=CASAS_DECIMAIS):
+  for atributo in ATRIBUTOS_NUMERICOS:
+    valores = getattr(trace, atributo, None)
+    if valores is None or isinstance(valores, str):
+      continue
+    valores = np.asarray(valores)
+    if valores.dtype.kind == 'f':
+      trace[atributo] = np.round(valores, casas)
+
+
+# Séries diárias: datas à meia-noite vão como 'AAAA-MM-DD' em vez do timestamp ISO completo
+def compactar_datas(trace):
+  for atributo in ('x', 'y'):
+    valores = getattr(trace, atributo, None)
+    if valores is None or isinstance(valores, str) or len(valores) == 0:
+      continue
+    valores = np.asarray(valores)
+    if valores.dtype.kind not in 'OM':
+      continue
+    try:
+      datas = pd.DatetimeIndex(valores)
+    except (TypeError, ValueError):
+      continue
+    if datas.tz is None and (datas.dropna() == datas.dropna().normalize()).all():
+      trace[atributo] = np.asarray(datas.strftime('%Y-%m-%d'), dtype=object)
+
+
+# O Plotly não permite trocar o tipo de um trace no lugar, então a figura é recriada se preciso
+def para_webgl(figura, limite=LIMITE_PONTOS_WEBGL):
+  grandes = [trace.type == 'scatter' and trace.x is not None and len(trace.x) > limite for trace in figura.data]
+  if not any(grandes):
+    return figura
+  import plotly.graph_objects as go
+  traces = []
+  for trace, grande in zip(figura.data, grandes):
+    propriedades = trace.to_plotly_json()
+    tipo = propriedades.pop('type')
+    traces.append(go.Scattergl(propriedades) if grande else go.Figure({'data': [{**propriedades, 'type': tipo}]}).data[0])
+  return go.Figure(data=traces, layout=figura.layout)
+
+
+# Aplica as reduções a uma figura já construída; idempotente
+def preparar(figura):
+  if getattr(figura, '_preparada', False):
+    return figura
+  for trace in figura.data:
+    reduzir_serie(trace)
+    arredondar(trace)
+    compactar_datas(trace)
+  figura = para_webgl(figura)
+  figura._preparada = True
+  return figura
+
+
+def atualizar_impressao(hash_, objeto):
+  if isinstance(objeto, pd.DataFrame):
+    hash_.update(repr(objeto.dtypes.to_dict()).encode())
+    hash_.update(pd.util.hash_pandas_object(objeto).to_numpy().tobytes())
+  elif isinstance(objeto, (pd.Series, pd.Index)):
+    hash_.update(repr((objeto.name, objeto.dtype)).encode())
+    hash_.update(pd.util.hash_pandas_object(objeto).to_numpy().tobytes())
+  elif isinstance(objeto, np.ndarray):
+    hash_.update(objeto.tobytes())
+  elif isinstance(objeto, (list, tuple)):
+    for item in objeto:
+      atualizar_impressao(hash_, item)
+  elif isinstance(objeto, dict):
+    for chave in sorted(objeto, key=str):
+      hash_.update(repr(chave).encode())
+      atualizar_impressao(hash_, objeto[chave])
+  else:
+    hash_.update(repr(objeto).encode())
+
+
+# Impressão digital dos dados e parâmetros de um gráfico
+def impressao_digital(*objetos):
+  hash_ = hashlib.blake2b(digest_size=16)
+  atualizar_impressao(hash_, objetos)
+  return hash_.hexdigest()
+
+
+# Figura pronta para `construir(*args, **kwargs)`, reconstruída só quando os dados mudam.
+# `construir` deve devolver a figura completa: a figura em cache é compartilhada e não pode
+# ser alterada depois.
+def figura(construir, *args, **kwargs):
+  chave = (f"{construir.__module__}.{construir.__qualname__}", impressao_digital(args, kwargs))
+  with _lock:
+    if chave in _figuras:
+      _figuras.move_to_end(chave)
+      return _figuras[chave]
+  pronta = preparar(construir(*args, **kwargs))
+  with _lock:
+    _figuras[chave] = pronta
+    while len(_figuras) > MAX_FIGURAS:
+      _figuras.popitem(last=False)
+  return pronta
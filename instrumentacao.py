@@ -0,0 +1,224 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Medição dos pontos quentes do dashboard: consultas ao BigQuery, APIs HTTP, transformações em
+# pandas e serialização dos gráficos. Cada medição vira um evento (registrado em log estruturado)
+# e alimenta contadores acumulados desde o início do processo, exportáveis no formato texto do
+# Prometheus. Os eventos ficam associados à sessão e à página da execução corrente do Streamlit,
+# o que permite mostrar no painel de depuração só o que a página atual custou.
+
+logger = logging.getLogger(__name__)
+
+ATIVA = os.environ.get('INSTRUMENTACAO', '1') == '1'
+MAX_EVENTOS = int(os.environ.get('MAX_EVENTOS_INSTRUMENTACAO', '5000'))
+
+_lock = threading.Lock()
+_eventos = deque(maxlen=MAX_EVENTOS)
+# (categoria, nome, pagina) -> somatórios
+_contadores = defaultdict(lambda: {'chamadas': 0, 'segundos': 0.0, 'linhas': 0, 'bytes': 0, 'acertos': 0, 'falhas': 0})
+# sessão -> (página, instante de início da execução corrente)
+_execucoes = {}
+# Pilha por thread das chamadas com cache em andamento; o corpo marca o topo quando executa
+_pilha_cache = threading.local()
+# Marcos da partida do processo (importações, primeiro gráfico, aquecimento), em segundos
+_marcos = {}
+# sessão -> início da execução cujo primeiro gráfico já foi medido
+_primeiro_grafico = {}
+
+
+def sessao_atual():
+  contexto = get_script_run_ctx(suppress_warning=True)
+  return contexto.session_id if contexto else None
+
+
+# `inicio` permite contar a execução desde o topo do script, antes das importações
+def iniciar_execucao(pagina, inicio=None):
+  descartar_sessoes_encerradas()
+  with _lock:
+    _execucoes[sessao_atual()] = (pagina, inicio or time.time())
+
+
+# Remove o estado por sessão das sessões que o Streamlit já encerrou (abas fechadas, desconexões)
+def descartar_sessoes_encerradas():
+  from streamlit.runtime import Runtime
+  if not Runtime.exists():
+    return
+  runtime = Runtime.instance()
+  with _lock:
+    encerradas = [sessao for sessao in _execucoes if sessao is not None and not runtime.is_active_session(sessao)]
+    for sessao in encerradas:
+      del _execucoes[sessao]
+      _primeiro_grafico.pop(sessao, None)
+
+
+def duracao_execucao():
+  return time.time() - _execucoes.get(sessao_atual(), (None, time.time()))[1]
+
+
+def pagina_atual():
+  return _execucoes.get(sessao_atual(), (None, 0))[0]
+
+
+def tamanho(resultado):
+  if isinstance(resultado, pd.DataFrame):
+    return len(resultado)
+  return None
+
+
+def registrar(categoria, nome, segundos, linhas=None, bytes_=None, cache=None):
+  if not ATIVA:
+    return
+  evento = {'instante': time.time(), 'sessao': sessao_atual(), 'pagina': pagina_atual(), 'categoria': categoria,
+            'nome': nome, 'segundos': round(segundos, 6), 'linhas': linhas, 'bytes': bytes_, 'cache': cache}
+  with _lock:
+    _eventos.append(evento)
+    contador = _contadores[(categoria, nome, evento['pagina'])]
+    contador['chamadas'] += 1
+    contador['segundos'] += segundos
+    contador['linhas'] += linhas or 0
+    contador['bytes'] += bytes_ or 0
+    if cache == 'acerto':
+      contador['acertos'] += 1
+    elif cache == 'falha':
+      contador['falhas'] += 1
+  logger.info(json.dumps(evento, default=str))
+
+
+# Guarda um marco da partida do processo; só a primeira medição de cada marco vale
+def marcar(nome, segundos):
+  with _lock:
+    _marcos.setdefault(nome, segundos)
+
+
+def marcos():
+  with _lock:
+    return dict(_marcos)
+
+
+# Tempo entre o início da execução e o primeiro gráfico exibido, medido uma vez por execução
+def registrar_primeiro_grafico():
+  sessao = sessao_atual()
+  with _lock:
+    _, inicio = _execucoes.get(sessao, (None, None))
+    if inicio is None or _primeiro_grafico.get(sessao) == inicio:
+      return
+    _primeiro_grafico[sessao] = inicio
+  segundos = time.time() - inicio
+  registrar('inicializacao', 'primeiro_grafico', segundos)
+  marcar('primeiro_grafico', segundos)
+
+
+def nome_funcao(funcao):
+  return funcao.__name__ if funcao.__module__ == '__main__' else f"{funcao.__module__}.{funcao.__name__}"
+
+
+# Decorador: registra duração e linhas de cada chamada
+def medido(categoria):
+  def decorador(funcao):
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+      inicio = time.perf_counter()
+      resultado = funcao(*args, **kwargs)
+      registrar(categoria, nome_funcao(funcao), time.perf_counter() - inicio, tamanho(resultado))
+      return resultado
+    return envolvida
+  return decorador
+
+
+# Envolve um decorador de cache (st.cache_data, st.cache_resource) registrando também acerto ou falha:
+# o corpo da função só roda na falha, e nesse caso marca a chamada no topo da pilha da thread
+def com_cache(cache, categoria):
+  def decorador(funcao):
+    @functools.wraps(funcao)
+    def corpo(*args, **kwargs):
+      _pilha_cache.chamadas[-1] = True
+      return funcao(*args, **kwargs)
+
+    cacheada = cache(corpo)
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+      if not hasattr(_pilha_cache, 'chamadas'):
+        _pilha_cache.chamadas = []
+      _pilha_cache.chamadas.append(False)
+      inicio = time.perf_counter()
+      try:
+        resultado = cacheada(*args, **kwargs)
+      finally:
+        executou = _pilha_cache.chamadas.pop()
+      registrar(categoria, nome_funcao(funcao), time.perf_counter() - inicio, tamanho(resultado),
+                cache='falha' if executou else 'acerto')
+      return resultado
+
+    envolvida.clear = getattr(cacheada, 'clear', None)
+    return envolvida
+  return decorador
+
+
+# Tamanho do JSON de uma figura do Plotly, que é o que o Streamlit envia ao navegador;
+# guardado na própria figura, que pode vir do cache de graficos.py. Serializar a figura custa
+# quase o mesmo que enviá-la, então o dashboard só mede com o painel de desempenho aberto
+def bytes_figura(figura):
+  if not ATIVA:
+    return None
+  if getattr(figura, '_bytes_json', None) is None:
+    figura._bytes_json = len(figura.to_json())
+  return figura._bytes_json
+
+
+def eventos(sessao=None, desde=0):
+  with _lock:
+    return [evento for evento in _eventos if evento['instante'] >= desde and (sessao is None or evento['sessao'] == sessao)]
+
+
+# Eventos da execução corrente da sessão, para o painel de depuração
+def eventos_da_execucao():
+  sessao = sessao_atual()
+  _, inicio = _execucoes.get(sessao, (None, 0))
+  return pd.DataFrame(eventos(sessao, inicio),
+                      columns=['instante', 'sessao', 'pagina', 'categoria', 'nome', 'segundos', 'linhas', 'bytes', 'cache'])
+
+
+def resumo(df):
+  return (df.groupby(['categoria', 'nome'], as_index=False)
+          .agg(chamadas=('segundos', 'size'), segundos=('segundos', 'sum'), linhas=('linhas', 'sum'),
+               bytes=('bytes', 'sum'), acertos=('cache', lambda cache: (cache == 'acerto').sum()))
+          .sort_values('segundos', ascending=False, ignore_index=True))
+
+
+def exportar_json():
+  return '\n'.join(json.dumps(evento, default=str) for evento in eventos())
+
+
+def rotulos(categoria, nome, pagina):
+  return f'categoria="{categoria}",nome="{nome}",pagina="{pagina or ""}"'
+
+
+# Contadores acumulados no formato texto de exposição do Prometheus
+def exportar_prometheus():
+  metricas = [
+    ('dashboard_chamadas_total', 'Chamadas medidas', 'chamadas'),
+    ('dashboard_duracao_segundos_total', 'Tempo acumulado em segundos', 'segundos'),
+    ('dashboard_linhas_total', 'Linhas retornadas', 'linhas'),
+    ('dashboard_bytes_total', 'Bytes processados no BigQuery ou enviados em gráficos', 'bytes'),
+    ('dashboard_cache_acertos_total', 'Acertos de cache (Streamlit; na categoria bigquery, o cache de resultados do BigQuery)', 'acertos'),
+    ('dashboard_cache_falhas_total', 'Falhas de cache (Streamlit; na categoria bigquery, o cache de resultados do BigQuery)', 'falhas'),
+  ]
+  with _lock:
+    contadores = {chave: dict(valor) for chave, valor in _contadores.items()}
+  linhas = []
+  for nome_metrica, ajuda, campo in metricas:
+    linhas += [f'# HELP {nome_metrica} {ajuda}', f'# TYPE {nome_metrica} counter']
+    linhas += [f'{nome_metrica}{{{rotulos(*chave)}}} {valor[campo]}' for chave, valor in sorted(contadores.items(), key=str)]
+  linhas += ['# HELP dashboard_inicializacao_segundos Marcos da partida do processo (importações, primeiro gráfico, aquecimento)',
+             '# TYPE dashboard_inicializacao_segundos gauge']
+  linhas += [f'dashboard_inicializacao_segundos{{marco="{nome}"}} {segundos}' for nome, segundos in sorted(marcos().items())]
+  return '\n'.join(linhas) + '\n'
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Junção por intervalo (o `c.data_inicio BETWEEN e.data_inicial AND e.data_final` das perguntas 7 a
+# 10 de analise_sql.sql) feita localmente: os instantes são ordenados uma vez e cada janela vira uma
+# fatia contígua do vetor ordenado, localizada com searchsorted. Serve tanto para chamados
+# individuais (data_inicio) quanto para linhas de rollups diários (data), e uma linha que cai em
+# janelas sobrepostas aparece uma vez para cada janela.
+
+PERIODOS = ['Antes', 'Durante', 'Depois']
+
+
+def para_datetime64(valores):
+  return pd.to_datetime(pd.Series(valores)).to_numpy(dtype='datetime64[ns]')
+
+
+# Pares (linha, janela) de cada instante contido em cada janela semiaberta [inicio, fim).
+# A busca é feita sobre os nanossegundos (int64), em que NaT é o menor valor e nunca cai numa janela
+def pares(instantes, inicios, fins):
+  instantes = para_datetime64(instantes).view('int64')
+  # Rollups e armazéns já vêm em ordem de data; só então vale pular a ordenação
+  if len(instantes) < 2 or (instantes[1:] >= instantes[:-1]).all():
+    ordem = np.arange(len(instantes))
+  else:
+    ordem = np.argsort(instantes)
+  ordenados = instantes[ordem]
+  inicios, fins = para_datetime64(inicios), para_datetime64(fins)
+  primeiros = np.searchsorted(ordenados, inicios.view('int64'), side='left')
+  ultimos = np.searchsorted(ordenados, fins.view('int64'), side='left')
+  quantidades = np.where(np.isnat(inicios) | np.isnat(fins), 0, np.maximum(ultimos - primeiros, 0))
+  janelas = np.repeat(np.arange(len(quantidades)), quantidades)
+  # Posição dentro da fatia de cada janela: 0, 1, ..., quantidade - 1
+  deslocamentos = np.arange(quantidades.sum()) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+  return ordem[np.repeat(primeiros, quantidades) + deslocamentos], janelas
+
+
+# Uma linha de `df` por evento em cuja janela ela cai, com id_evento (índice de `eventos`), evento e
+# periodo: Antes = [data_inicial - dias_antes, data_inicial), Durante = [data_inicial, data_final + 1 dia)
+# e Depois = [data_final + 1 dia, data_final + 1 dia + dias_depois), sempre em dias inteiros
+def marcar_eventos(df, eventos, coluna='data', dias_antes=0, dias_depois=0):
+  inicios = para_datetime64(eventos['data_inicial'])
+  fins = para_datetime64(eventos['data_final']) + np.timedelta64(1, 'D')
+  linhas, janelas = pares(df[coluna],
+                          inicios - np.timedelta64(dias_antes, 'D'),
+                          fins + np.timedelta64(dias_depois, 'D'))
+
+  marcados = df.iloc[linhas].reset_index(drop=True)
+  instantes = para_datetime64(marcados[coluna])
+  periodo = np.select([instantes < inicios[janelas], instantes < fins[janelas]], [0, 1], 2)
+  marcados['id_evento'] = eventos.index.to_numpy()[janelas]
+  if 'evento' in eventos.columns:
+    marcados['evento'] = eventos['evento'].to_numpy()[janelas]
+  marcados['periodo'] = pd.Categorical.from_codes(periodo, categories=PERIODOS)
+  return marcados
+
+
+# Chamados de cada evento por período e média diária durante o evento (perguntas 8 a 10),
+# a partir das linhas marcadas por marcar_eventos
+def resumo_eventos(marcados, eventos, coluna_contagem='contagem'):
+  por_periodo = (marcados.groupby(['id_evento', 'periodo'], observed=False)[coluna_contagem].sum()
+                 .unstack(fill_value=0))
+  por_periodo.columns = por_periodo.columns.astype(str)
+  por_periodo = por_periodo.reindex(index=eventos.index, columns=PERIODOS, fill_value=0)
+  dias = (pd.to_datetime(eventos['data_final']) - pd.to_datetime(eventos['data_inicial'])).dt.days + 1
+  resumo = eventos[['evento', 'data_inicial', 'data_final']].join(por_periodo)
+  resumo['media_diaria_durante'] = resumo['Durante'] / dias
+  return resumo.reset_index(drop=True)
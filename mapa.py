@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+
+# Agregação espacial dos chamados em uma grade regular de latitude/longitude.
+# Acima de LIMITE_PONTOS_MAPA os mapas deixam de enviar um ponto por chamado e passam a
+# mostrar a densidade por célula, então o tamanho do gráfico não cresce com o intervalo de datas.
+
+LIMITE_PONTOS_MAPA = int(os.environ.get('LIMITE_PONTOS_MAPA', '20000'))
+TAMANHO_CELULA = float(os.environ.get('TAMANHO_CELULA_MAPA', '0.005'))  # ~500 m no Rio de Janeiro
+CASAS_DECIMAIS = 6
+
+
+def centro_celula(coordenada, tamanho=TAMANHO_CELULA):
+  return np.round((np.floor(coordenada / tamanho) + 0.5) * tamanho, CASAS_DECIMAIS)
+
+
+# Mesma célula de centro_celula, calculada no BigQuery para não transferir os pontos brutos
+def expressao_celula(coluna, tamanho=TAMANHO_CELULA):
+  return f"ROUND((FLOOR(CAST({coluna} AS FLOAT64) / {tamanho}) + 0.5) * {tamanho}, {CASAS_DECIMAIS})"
+
+
+def agregar_em_grade(df, tamanho=TAMANHO_CELULA, chaves=('tipo', 'status')):
+  grade = df.assign(
+    latitude=centro_celula(df['latitude'].astype(float), tamanho),
+    longitude=centro_celula(df['longitude'].astype(float), tamanho),
+  )
+  return grade.groupby(['latitude', 'longitude', *chaves], as_index=False, observed=True).size().rename(columns={'size': 'contagem'})
+
+
+# Total por célula com o tipo de chamado predominante, usado no mapa de densidade
+def resumir_celulas(grade):
+  por_tipo = grade.groupby(['latitude', 'longitude', 'tipo'], as_index=False, observed=True)['contagem'].sum()
+  total = por_tipo.groupby(['latitude', 'longitude'], as_index=False)['contagem'].sum()
+  predominante = por_tipo.loc[por_tipo.groupby(['latitude', 'longitude'])['contagem'].idxmax(), ['latitude', 'longitude', 'tipo']]
+  return total.merge(predominante, on=['latitude', 'longitude']).rename(columns={'tipo': 'tipo_predominante'})
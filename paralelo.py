@@ -0,0 +1,45 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Execução simultânea das buscas independentes de uma página (BigQuery e APIs HTTP),
+# para que a latência da página seja a da busca mais lenta e não a soma de todas.
+# Uma tarefa que já roda numa thread do executor e chama carregar_em_paralelo de novo (uma
+# função com cache que também carrega em paralelo) executa as tarefas internas na própria
+# thread: esperar por elas no mesmo executor travaria quando todas as threads estivessem
+# ocupadas por tarefas externas à espera das internas. O mesmo vale para threads de fundo fora
+# de uma sessão (ver aquecimento.py), que marcam a si mesmas com executar_em_linha.
+
+MAX_TRABALHADORES = int(os.environ.get('MAX_TRABALHADORES_CARGA', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_TRABALHADORES, thread_name_prefix='carga')
+_local = threading.local()
+
+
+# Recebe tuplas (funcao, *args) e devolve os resultados na mesma ordem; exceções são propagadas
+def carregar_em_paralelo(*tarefas):
+  if getattr(_local, 'no_executor', False):
+    return [funcao(*args) for funcao, *args in tarefas]
+  contexto = get_script_run_ctx(suppress_warning=True)
+
+  def executar(funcao, *args):
+    # O contexto da sessão permite que st.cache_data e st.error funcionem dentro da thread
+    add_script_run_ctx(threading.current_thread(), contexto)
+    _local.no_executor = True
+    try:
+      return funcao(*args)
+    finally:
+      _local.no_executor = False
+
+  futuros = [_executor.submit(executar, *tarefa) for tarefa in tarefas]
+  return [futuro.result() for futuro in futuros]
+
+
+# Faz carregar_em_paralelo executar as tarefas em sequência na thread atual. Para threads de fundo
+# que chamam funções com st.cache_data: a thread segura a trava de cálculo da chave enquanto espera
+# as tarefas internas, e as sessões que pedem a mesma chave ocupam as threads do executor esperando
+# essa trava, de modo que as tarefas internas nunca ganhariam uma thread
+def executar_em_linha():
+  _local.no_executor = True
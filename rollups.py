@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+import armazem
+import consultas
+from armazem import DIRETORIO_DADOS, dias_do_intervalo, para_data
+
+# Agregados pré-materializados das páginas, construídos a partir do armazém diário (armazem.py)
+# e gravados em um Parquet por mês. O dashboard lê apenas estas tabelas; o refresh incremental
+# (atualizar_rollups.py) usa uma marca d'água em `data_inicio` e reconstrói só os dias afetados
+# por chamados que chegaram atrasados.
+
+DIRETORIO_ROLLUPS = os.path.join(DIRETORIO_DADOS, 'rollups')
+ARQUIVO_MARCA = os.path.join(DIRETORIO_ROLLUPS, 'marca_dagua.json')
+INICIO_ROLLUPS = date.fromisoformat(os.environ.get('INICIO_ROLLUPS', '2021-01-01'))
+# Dias antes da marca d'água reconferidos a cada refresh em busca de chamados atrasados
+JANELA_ATRASO = int(os.environ.get('JANELA_ATRASO_DIAS', '7'))
+
+# Nome do rollup -> chaves de agrupamento
+ROLLUPS = {
+  'dia_tipo_status': ['data', 'tipo', 'status'],
+  'dia_hora': ['data', 'hora'],
+  'dia_bairro': ['data', 'id_bairro'],
+}
+
+_lock = threading.Lock()
+
+
+def primeiro_dia_do_mes(dia):
+  return dia.replace(day=1)
+
+
+def ultimo_dia_do_mes(dia):
+  return (primeiro_dia_do_mes(dia) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def meses_do_intervalo(data_inicio, data_fim):
+  return sorted({primeiro_dia_do_mes(dia) for dia in dias_do_intervalo(data_inicio, data_fim)})
+
+
+def caminho(nome, mes):
+  return os.path.join(DIRETORIO_ROLLUPS, nome, f"{mes:%Y-%m}.parquet")
+
+
+def ler_marca():
+  if not os.path.exists(ARQUIVO_MARCA):
+    return {'data_inicio_max': None, 'meses': {}}
+  with open(ARQUIVO_MARCA, encoding='utf-8') as arquivo:
+    return json.load(arquivo)
+
+
+def salvar_marca(marca):
+  os.makedirs(DIRETORIO_ROLLUPS, exist_ok=True)
+  temporario = f"{ARQUIVO_MARCA}.{os.getpid()}.{threading.get_ident()}.tmp"
+  with open(temporario, 'w', encoding='utf-8') as arquivo:
+    json.dump(marca, arquivo, indent=2)
+  os.replace(temporario, ARQUIVO_MARCA)
+
+
+# Mesma convenção do EXTRACT(DAYOFWEEK) do BigQuery: 1 = domingo, 7 = sábado
+def dia_semana(datas):
+  return ((datas.dt.dayofweek + 1) % 7 + 1).astype('int8')
+
+
+def agregar(agregado, nome):
+  return agregado.groupby(ROLLUPS[nome], as_index=False, dropna=False, observed=True)['contagem'].sum()
+
+
+def gravar(df, destino):
+  os.makedirs(os.path.dirname(destino), exist_ok=True)
+  temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+  df.to_parquet(temporario, index=False)
+  os.replace(temporario, destino)
+
+
+# Reconstrói todos os rollups de um mês até ontem (o dia corrente nunca é materializado) e devolve
+# o agregado diário do mês. Se algum dia veio amostrado ou cortado e por isso não foi gravado no
+# armazém (ver armazem.resultado_completo), o mês é usado só nesta leitura: não é gravado nem
+# entra na marca d'água, para ser reconstruído na próxima leitura ou refresh
+def construir_mes(mes, executar_query):
+  ate = min(ultimo_dia_do_mes(mes), date.today() - timedelta(days=1))
+  agregado = armazem.carregar_agregado(mes, ate, executar_query)
+  if not armazem.dias_armazenados(mes, ate):
+    return agregado
+  for nome in ROLLUPS:
+    gravar(agregar(agregado, nome), caminho(nome, mes))
+  with _lock:
+    marca = ler_marca()
+    marca['meses'][f"{mes:%Y-%m}"] = ate.isoformat()
+    salvar_marca(marca)
+  return agregado
+
+
+def mes_atualizado(mes, marca):
+  ate = marca['meses'].get(f"{mes:%Y-%m}")
+  esperado = min(ultimo_dia_do_mes(mes), date.today() - timedelta(days=1))
+  return ate is not None and date.fromisoformat(ate) >= esperado and all(
+    os.path.exists(caminho(nome, mes)) for nome in ROLLUPS)
+
+
+# Lê um rollup para o intervalo, materializando antes os meses ausentes ou desatualizados.
+# O dia corrente é agregado na hora a partir do armazém.
+def carregar(nome, data_inicio, data_fim, executar_query):
+  inicio, fim = para_data(data_inicio), para_data(data_fim)
+  hoje = date.today()
+  partes = []
+  if inicio < hoje:
+    marca = ler_marca()
+    for mes in meses_do_intervalo(inicio, min(fim, hoje - timedelta(days=1))):
+      if mes_atualizado(mes, marca):
+        partes.append(pd.read_parquet(caminho(nome, mes)))
+      else:
+        partes.append(agregar(construir_mes(mes, executar_query), nome))
+  if fim >= hoje:
+    partes.append(agregar(armazem.carregar_agregado(max(inicio, hoje), fim, executar_query), nome))
+
+  df = pd.concat(partes, ignore_index=True)
+  df['data'] = pd.to_datetime(df['data'])
+  df = df[(df['data'] >= pd.Timestamp(inicio)) & (df['data'] <= pd.Timestamp(fim))]
+  return df.reset_index(drop=True)
+
+
+# Refresh incremental: reconfere as contagens diárias desde (marca d'água - JANELA_ATRASO) e
+# reconstrói apenas os dias cujo total mudou (chamados novos ou atrasados) e os meses que os contêm
+def atualizar(executar_query, desde=None, janela_atraso=JANELA_ATRASO):
+  marca = ler_marca()
+  ontem = date.today() - timedelta(days=1)
+  if desde is None:
+    ultimo = marca['data_inicio_max']
+    desde = para_data(ultimo) - timedelta(days=janela_atraso) if ultimo else INICIO_ROLLUPS
+  desde = para_data(desde)
+  if desde > ontem:
+    return []
+
+  remotas = executar_query(*consultas.contagem_diaria(desde, ontem))
+  remotas['data'] = pd.to_datetime(remotas['data'])
+  locais = armazem.totais_diarios(desde, ontem)
+  comparacao = pd.DataFrame({'data': pd.to_datetime(dias_do_intervalo(desde, ontem))})
+  comparacao = comparacao.merge(remotas[['data', 'contagem']], on='data', how='left')
+  comparacao = comparacao.merge(locais.rename(columns={'contagem': 'local'}), on='data', how='left')
+  afetados = comparacao[comparacao['contagem'].fillna(0) != comparacao['local'].fillna(-1)]['data'].dt.date.tolist()
+
+  armazem.descartar_dias(afetados)
+  meses = {primeiro_dia_do_mes(dia) for dia in afetados}
+  meses |= {mes for mes in meses_do_intervalo(desde, ontem) if not mes_atualizado(mes, marca)}
+  for mes in sorted(meses):
+    construir_mes(mes, executar_query)
+
+  with _lock:
+    marca = ler_marca()
+    if not remotas.empty:
+      maximo = pd.Timestamp(remotas['ultimo_inicio'].max())
+      anterior = marca['data_inicio_max']
+      marca['data_inicio_max'] = max(maximo, pd.Timestamp(anterior)).isoformat() if anterior else maximo.isoformat()
+    salvar_marca(marca)
+  return afetados
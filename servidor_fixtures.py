@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import os
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+# Servidor local que substitui as APIs externas do dashboard (arquivo do Open-Meteo e feriados
+# do date.nager.at) em testes offline.
+# Responde a partir de respostas gravadas em `fixtures/`; com --gravar, os dias que não estão
+# gravados são buscados na API real e acrescentados ao arquivo. Sem gravação nem rede, responde
+# com uma climatologia sintética determinística (marcada no cabeçalho X-Fixture).
+#
+# Uso:
+#   python servidor_fixtures.py --porta 8765
+#   OPEN_METEO_URL=http://localhost:8765/v1/archive \
+#   NAGER_URL=http://localhost:8765/api/v3/PublicHolidays streamlit run dashboard_1746.py
+
+OPEN_METEO_REAL = 'https://archive-api.open-meteo.com/v1/archive'
+NAGER_REAL = 'https://date.nager.at/api/v3/PublicHolidays'
+DIRETORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ARQUIVO_CLIMA = 'open_meteo_diario.json'
+
+
+def carregar_json(caminho, padrao):
+  if not os.path.exists(caminho):
+    return padrao
+  with open(caminho, encoding='utf-8') as arquivo:
+    return json.load(arquivo)
+
+
+def salvar_json(caminho, conteudo):
+  os.makedirs(os.path.dirname(caminho), exist_ok=True)
+  with open(caminho, 'w', encoding='utf-8') as arquivo:
+    json.dump(conteudo, arquivo, ensure_ascii=False)
+
+
+# Valores plausíveis para o Rio de Janeiro, estáveis entre execuções
+def clima_sintetico(dia, variavel):
+  fase = 2 * math.pi * (dia.timetuple().tm_yday - 15) / 365.25
+  semente = dia.toordinal()
+  if variavel == 'temperature_2m_mean':
+    return round(24 + 3.5 * math.cos(fase) + ((semente * 7919) % 31 - 15) / 10, 1)
+  if variavel == 'precipitation_sum':
+    return [0.0, 0.0, 0.0, 0.4, 2.1, 6.3, 14.8, 31.5][(semente * 104729) % 8]
+  if variavel == 'weather_code':
+    return [0, 1, 2, 3, 51, 61, 63, 65][(semente * 104729) % 8]
+  return None
+
+
+# Domingo de Páscoa pelo algoritmo de Meeus/Jones/Butcher
+def pascoa(ano):
+  a, b, c = ano % 19, ano // 100, ano % 100
+  d, e = b // 4, b % 4
+  g = (8 * b + 13) // 25
+  h = (19 * a + b - d - g + 15) % 30
+  i, k = c // 4, c % 4
+  l = (32 + 2 * e + 2 * i - h - k) % 7
+  m = (a + 11 * h + 22 * l) // 451
+  mes = (h + l - 7 * m + 114) // 31
+  dia = (h + l - 7 * m + 114) % 31 + 1
+  return date(ano, mes, dia)
+
+
+# Feriados nacionais calculados, no mesmo formato da API do date.nager.at
+def feriados_sinteticos(ano):
+  domingo_pascoa = pascoa(ano)
+  feriados = [
+    (date(ano, 1, 1), 'Confraternização Universal', "New Year's Day"),
+    (domingo_pascoa - timedelta(days=47), 'Carnaval', 'Carnival'),
+    (domingo_pascoa - timedelta(days=2), 'Sexta-feira Santa', 'Good Friday'),
+    (date(ano, 4, 21), 'Dia de Tiradentes', 'Tiradentes'),
+    (date(ano, 5, 1), 'Dia do Trabalhador', 'Labour Day'),
+    (domingo_pascoa + timedelta(days=60), 'Corpus Christi', 'Corpus Christi'),
+    (date(ano, 9, 7), 'Dia da Independência', 'Independence Day'),
+    (date(ano, 10, 12), 'Nossa Senhora Aparecida', 'Our Lady of Aparecida'),
+    (date(ano, 11, 2), 'Dia de Finados', "All Souls' Day"),
+    (date(ano, 11, 15), 'Proclamação da República', 'Republic Proclamation Day'),
+    (date(ano, 12, 25), 'Natal', 'Christmas Day'),
+  ]
+  return [{'date': dia.isoformat(), 'localName': nome_local, 'name': nome, 'countryCode': 'BR',
+           'fixed': False, 'global': True, 'counties': None, 'launchYear': None, 'types': ['Public']}
+          for dia, nome_local, nome in sorted(feriados)]
+
+
+class Fixtures:
+  def __init__(self, diretorio=DIRETORIO_FIXTURES, gravar=False):
+    self.diretorio = diretorio
+    self.gravar = gravar
+    self.lock = threading.Lock()
+
+  def clima(self, parametros):
+    inicio = date.fromisoformat(parametros['start_date'])
+    fim = date.fromisoformat(parametros['end_date'])
+    variaveis = parametros['daily'].split(',')
+    caminho = os.path.join(self.diretorio, ARQUIVO_CLIMA)
+    with self.lock:
+      # Gravação: {variavel: {data: valor}}
+      gravado = carregar_json(caminho, {})
+      dias = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+      faltantes = [dia for dia in dias if any(dia.isoformat() not in gravado.get(v, {}) for v in variaveis)]
+      if faltantes and self.gravar:
+        real = requests.get(OPEN_METEO_REAL, params={**parametros, 'start_date': faltantes[0].isoformat(),
+                                                     'end_date': faltantes[-1].isoformat()}, timeout=(5, 60))
+        real.raise_for_status()
+        diario = real.json()['daily']
+        for variavel in variaveis:
+          gravado.setdefault(variavel, {}).update(zip(diario['time'], diario[variavel]))
+        salvar_json(caminho, gravado)
+        faltantes = []
+
+    diario = {'time': [dia.isoformat() for dia in dias]}
+    for variavel in variaveis:
+      valores = gravado.get(variavel, {})
+      diario[variavel] = [valores.get(dia.isoformat(), clima_sintetico(dia, variavel)) for dia in dias]
+    return {'latitude': parametros.get('latitude'), 'longitude': parametros.get('longitude'), 'daily': diario}, bool(faltantes)
+
+  def feriados(self, ano, pais):
+    caminho = os.path.join(self.diretorio, f'nager_feriados_{ano}_{pais}.json')
+    with self.lock:
+      gravado = carregar_json(caminho, None)
+      if gravado is None and self.gravar:
+        real = requests.get(f'{NAGER_REAL}/{ano}/{pais}', timeout=(5, 60))
+        real.raise_for_status()
+        gravado = real.json()
+        salvar_json(caminho, gravado)
+    if gravado is None:
+      return feriados_sinteticos(ano), True
+    return gravado, False
+
+
+def criar_handler(fixtures):
+  class Handler(BaseHTTPRequestHandler):
+    def responder(self, status, conteudo, sintetico=False):
+      corpo = json.dumps(conteudo).encode('utf-8')
+      self.send_response(status)
+      self.send_header('Content-Type', 'application/json')
+      self.send_header('Content-Length', str(len(corpo)))
+      self.send_header('X-Fixture', 'sintetico' if sintetico else 'gravado')
+      self.end_headers()
+      self.wfile.write(corpo)
+
+    def do_GET(self):
+      url = urlparse(self.path)
+      parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+      try:
+        if url.path == '/v1/archive':
+          conteudo, sintetico = fixtures.clima(parametros)
+          self.responder(200, conteudo, sintetico)
+        elif url.path.startswith('/api/v3/PublicHolidays/'):
+          ano, pais = url.path.rstrip('/').split('/')[-2:]
+          conteudo, sintetico = fixtures.feriados(int(ano), pais)
+          self.responder(200, conteudo, sintetico)
+        else:
+          self.responder(404, {'error': True, 'reason': f'Rota sem fixture: {url.path}'})
+      except (KeyError, ValueError) as erro:
+        self.responder(400, {'error': True, 'reason': str(erro)})
+
+    def log_message(self, formato, *args):
+      pass
+
+  return Handler
+
+
+def iniciar(porta=0, diretorio=DIRETORIO_FIXTURES, gravar=False):
+  servidor = ThreadingHTTPServer(('127.0.0.1', porta), criar_handler(Fixtures(diretorio, gravar)))
+  threading.Thread(target=servidor.serve_forever, daemon=True).start()
+  return servidor
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Servidor de fixtures para as APIs externas do dashboard.')
+  parser.add_argument('--porta', type=int, default=8765)
+  parser.add_argument('--diretorio', default=DIRETORIO_FIXTURES)
+  parser.add_argument('--gravar', action='store_true', help='busca na API real os dias ainda não gravados')
+  argumentos = parser.parse_args()
+  servidor = ThreadingHTTPServer(('127.0.0.1', argumentos.porta),
+                                 criar_handler(Fixtures(argumentos.diretorio, argumentos.gravar)))
+  print(f"Servidor de fixtures em http://127.0.0.1:{argumentos.porta}")
+  servidor.serve_forever()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Tabela de dados brutos paginada no servidor: filtros e ordenação viram um vetor de posições
+# (guardado em cache pelo dashboard), e só as linhas da página visível são enviadas ao navegador.
+# A exportação percorre as mesmas posições em lotes, gravando em um arquivo temporário em vez de
+# montar o extrato inteiro em memória.
+
+TAMANHO_LOTE_EXPORTACAO = int(os.environ.get('TAMANHO_LOTE_EXPORTACAO', '100000'))
+# Acima disso o arquivo temporário da exportação sai da memória e vai para o disco
+MAX_MEMORIA_EXPORTACAO = 64 * 1024 ** 2
+TAMANHOS_PAGINA = [25, 50, 100, 500]
+
+
+# Posições das linhas que passam pelos filtros ((coluna, valores), ...), na ordem pedida
+def posicoes(df, filtros=(), coluna=None, ascendente=True):
+  mascara = np.ones(len(df), dtype=bool)
+  for coluna_filtro, valores in filtros:
+    if valores:
+      mascara &= df[coluna_filtro].isin(valores).to_numpy()
+  selecionadas = np.flatnonzero(mascara)
+  if coluna is None:
+    return selecionadas
+  valores = df[coluna].iloc[selecionadas].reset_index(drop=True)
+  ordem = valores.sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()
+  return selecionadas[ordem]
+
+
+def numero_paginas(total, tamanho):
+  return max(-(-total // tamanho), 1)
+
+
+def pagina(df, posicoes_, numero, tamanho):
+  inicio = (numero - 1) * tamanho
+  return df.iloc[posicoes_[inicio:inicio + tamanho]].reset_index(drop=True)
+
+
+def lotes(df, posicoes_, tamanho=TAMANHO_LOTE_EXPORTACAO):
+  for inicio in range(0, len(posicoes_), tamanho):
+    yield df.iloc[posicoes_[inicio:inicio + tamanho]]
+
+
+def exportar_csv(df, posicoes_):
+  arquivo = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA_EXPORTACAO, mode='w+b')
+  df.iloc[0:0].to_csv(arquivo, index=False, encoding='utf-8')
+  for lote in lotes(df, posicoes_):
+    lote.to_csv(arquivo, index=False, header=False, encoding='utf-8')
+  arquivo.seek(0)
+  return arquivo
+
+
+def exportar_parquet(df, posicoes_):
+  arquivo = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA_EXPORTACAO, mode='w+b')
+  esquema = pa.Schema.from_pandas(df, preserve_index=False)
+  with pq.ParquetWriter(arquivo, esquema) as escritor:
+    for lote in lotes(df, posicoes_):
+      escritor.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+  arquivo.seek(0)
+  return arquivo
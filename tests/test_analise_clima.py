@@ -0,0 +1,38 @@
+import pandas as pd
+
+import analise_clima
+
+
+def test_categorizar_precipitacao_limites_inclusivos():
+  categorias = analise_clima.categorizar_precipitacao(pd.Series([0, 0.1, 5, 5.1, 25, 25.1]))
+  assert categorias.astype(str).tolist() == ['Sem chuva', 'Chuva leve', 'Chuva leve', 'Chuva moderada',
+                                             'Chuva moderada', 'Chuva forte']
+
+
+def test_impacto_igual_ao_calculo_por_groupby():
+  datas = pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04'])
+  clima = pd.DataFrame({'data': datas[:3], 'temperatura_media': [20.0, 25.0, 30.0], 'precipitacao': [0.0, 10.0, 10.5]})
+  # O dia 4 não tem clima e fica fora de todas as tabelas
+  chamados = pd.DataFrame({'data': datas[[0, 0, 1, 2, 2, 3]], 'tipo': ['A', 'B', 'A', 'A', 'B', 'B'],
+                           'contagem_chamados': [3, 1, 4, 5, 9, 100]})
+  resultado = analise_clima.impacto(chamados, clima)
+
+  assert resultado['diarios']['contagem_chamados'].tolist() == [4, 4, 14]
+  assert resultado['diarios']['categoria_precipitacao'].astype(str).tolist() == ['Sem chuva', 'Chuva moderada', 'Chuva moderada']
+
+  com_clima = chamados.merge(clima, on='data')
+  faixas = analise_clima.faixas_temperatura(resultado['diarios'].set_index('data')['temperatura_media'])
+  esperado = (com_clima.assign(faixa=faixas.reindex(com_clima['data']).astype(str).to_numpy())
+              .pivot_table(index='tipo', columns='faixa', values='contagem_chamados', aggfunc='mean', fill_value=0))
+  pd.testing.assert_frame_equal(resultado['tipo_temperatura'], esperado, check_names=False, check_dtype=False)
+
+  # Só o dia 3 passa de LIMITE_DIA_CHUVOSO (10 mm não conta)
+  assert resultado['top_tipos_chuva'].to_dict('list') == {'tipo': ['B', 'A'], 'contagem_chamados': [9, 5]}
+
+
+def test_impacto_sem_clima():
+  chamados = pd.DataFrame({'data': pd.to_datetime(['2024-01-01']), 'tipo': ['A'], 'contagem_chamados': [1]})
+  clima = pd.DataFrame({'data': pd.Series(dtype='datetime64[ns]'), 'temperatura_media': pd.Series(dtype='float64'),
+                        'precipitacao': pd.Series(dtype='float64')})
+  resultado = analise_clima.impacto(chamados, clima)
+  assert resultado['diarios'].empty and resultado['tipo_temperatura'].empty and resultado['top_tipos_chuva'].empty
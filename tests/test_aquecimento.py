@@ -0,0 +1,40 @@
+import threading
+
+import aquecimento
+import paralelo
+
+
+# A tarefa do aquecimento segura a trava de cálculo da chave (como st.cache_data) e carrega em
+# paralelo; as sessões que pedem a mesma chave ocupam todas as threads do executor esperando essa
+# trava. As tarefas internas do aquecimento precisam rodar na própria thread dele para terminar
+def test_aquecimento_nao_trava_com_executor_ocupado():
+  trava = threading.Lock()
+  travada, ocupados = threading.Event(), threading.Event()
+  esperando = []
+
+  def com_cache():
+    if not trava.acquire(timeout=10):
+      raise TimeoutError()
+    try:
+      travada.set()
+      ocupados.wait(5)
+      return sum(paralelo.carregar_em_paralelo(*[(lambda j: j, j) for j in range(3)]))
+    finally:
+      trava.release()
+
+  def sessao(_):
+    esperando.append(1)
+    if len(esperando) == paralelo.MAX_TRABALHADORES:
+      ocupados.set()
+    return com_cache()
+
+  tarefa = aquecimento.Aquecimento([('eventos', com_cache)]).iniciar()
+  travada.wait(5)
+  sessoes = []
+  thread = threading.Thread(target=lambda: sessoes.extend(
+    paralelo.carregar_em_paralelo(*[(sessao, i) for i in range(paralelo.MAX_TRABALHADORES)])), daemon=True)
+  thread.start()
+  tarefa.thread.join(timeout=10)
+  assert tarefa.concluido() and not tarefa.erros
+  thread.join(timeout=10)
+  assert sessoes == [3] * paralelo.MAX_TRABALHADORES
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from cache_intervalos import CacheIntervalos
+
+
+def buscador(pedidos, atributos=None):
+  def buscar(inicio, fim):
+    pedidos.append((inicio, fim))
+    df = pd.DataFrame({'data': pd.date_range(inicio, fim), 'valor': 1})
+    df.attrs.update(atributos or {})
+    return df
+  return buscar
+
+
+def test_busca_so_as_lacunas_agrupadas():
+  cache, pedidos = CacheIntervalos(), []
+  cache.obter('c', date(2024, 1, 3), date(2024, 1, 4), buscador(pedidos))
+  cache.obter('c', date(2024, 1, 8), date(2024, 1, 8), buscador(pedidos))
+  pedidos.clear()
+  df = cache.obter('c', date(2024, 1, 1), date(2024, 1, 10), buscador(pedidos))
+  assert pedidos == [(date(2024, 1, 1), date(2024, 1, 2)), (date(2024, 1, 5), date(2024, 1, 7)),
+                     (date(2024, 1, 9), date(2024, 1, 10))]
+  assert df['data'].tolist() == list(pd.date_range('2024-01-01', '2024-01-10'))
+  assert cache.dias_faltantes('c', date(2024, 1, 1), date(2024, 1, 11)) == [date(2024, 1, 11)]
+  assert cache.dias_faltantes('outra', date(2024, 1, 1), date(2024, 1, 1)) == [date(2024, 1, 1)]
+
+
+def test_intervalo_vazio():
+  df = CacheIntervalos().obter('c', date(2024, 1, 2), date(2024, 1, 1), buscador([]))
+  assert df.empty and list(df.columns) == ['data']
+
+
+def test_descarta_vencidos_e_excedente_pelo_uso_mais_antigo():
+  pedidos = []
+  vencido = CacheIntervalos(ttl=-1)
+  vencido.obter('c', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  vencido.obter('c', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  assert len(pedidos) == 2 and not vencido.segmentos and vencido.total_bytes == 0
+
+  cache = CacheIntervalos()
+  cache.obter('a', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  cache.max_bytes = cache.total_bytes * 2
+  cache.obter('b', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  cache.obter('a', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  cache.obter('c', date(2024, 1, 1), date(2024, 1, 1), buscador(pedidos))
+  assert list(cache.segmentos) == [('a', date(2024, 1, 1)), ('c', date(2024, 1, 1))]
+  assert cache.total_bytes == sum(segmento[3] for segmento in cache.segmentos.values())
+
+
+def test_segmento_maior_que_o_limite_entra_no_resultado():
+  cache = CacheIntervalos(max_bytes=0)
+  df = cache.obter('c', date(2024, 1, 1), date(2024, 1, 3), buscador([]))
+  assert len(df) == 3 and not cache.segmentos and cache.total_bytes == 0
+
+
+def test_resultado_herda_a_menor_amostra_dos_segmentos():
+  cache = CacheIntervalos()
+  cache.obter('c', date(2024, 1, 1), date(2024, 1, 2), buscador([], {'fracao_amostra': 0.25, 'limitado': True}))
+  df = cache.obter('c', date(2024, 1, 1), date(2024, 1, 2) + timedelta(days=1), buscador([]))
+  assert df.attrs == {'fracao_amostra': 0.25, 'limitado': True}
+  assert cache.obter('c', date(2024, 1, 3), date(2024, 1, 3), buscador([])).attrs == {'fracao_amostra': 1.0,
+                                                                                     'limitado': False}
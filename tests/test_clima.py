@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import clima
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+  monkeypatch.setattr(clima, 'ARQUIVO_CLIMA', str(tmp_path / 'diario.parquet'))
+  monkeypatch.setattr(clima, '_sem_dados', {})
+  pedidos = []
+
+  # Só os dias até anteontem vêm com valores, como os ainda não consolidados no Open-Meteo
+  def buscar_api(inicio, fim):
+    pedidos.append((inicio, fim))
+    dias = pd.date_range(inicio, min(fim, date.today() - timedelta(days=2)))
+    return pd.DataFrame({'data': dias, 'temperatura_media': 25.0, 'precipitacao': 0.0, 'weather_code': 1.0})
+
+  monkeypatch.setattr(clima, 'buscar_api', buscar_api)
+  return pedidos
+
+
+def test_dias_sem_dados_nao_sao_pedidos_de_novo_antes_do_ttl(api, monkeypatch):
+  hoje = date.today()
+  assert len(clima.carregar(hoje - timedelta(days=9), hoje)) == 8
+  assert len(clima.carregar(hoje - timedelta(days=9), hoje)) == 8
+  assert len(api) == 1
+
+  monkeypatch.setattr(clima, 'TTL_DIAS_SEM_DADOS', -1)
+  clima.carregar(hoje - timedelta(days=9), hoje)
+  assert api[-1] == (hoje - timedelta(days=1), hoje)
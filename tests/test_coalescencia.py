@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+import coalescencia
+
+
+class Controle(BaseException):
+  pass
+
+
+def esperar_seguidor(funcao, *args):
+  resultado = []
+  thread = threading.Thread(target=lambda: resultado.append(funcao(*args)), daemon=True)
+  thread.start()
+  return thread, resultado
+
+
+def test_seguidor_recebe_resultado_da_lider():
+  liberar, chamadas = threading.Event(), []
+
+  @coalescencia.coalescido
+  def buscar(valor):
+    chamadas.append(valor)
+    liberar.wait(5)
+    return valor * 2
+
+  lider, resultado_lider = esperar_seguidor(buscar, 21)
+  while not chamadas:
+    pass
+  seguidor, resultado_seguidor = esperar_seguidor(buscar, 21)
+  liberar.set()
+  lider.join(5)
+  seguidor.join(5)
+  assert resultado_lider == resultado_seguidor == [42]
+  assert chamadas == [21]
+
+
+def test_seguidor_recebe_erro_da_lider():
+  liberar, chamadas = threading.Event(), []
+  erros = []
+
+  @coalescencia.coalescido
+  def buscar():
+    chamadas.append(1)
+    liberar.wait(5)
+    raise ValueError('falhou')
+
+  def chamar():
+    try:
+      buscar()
+    except ValueError as erro:
+      erros.append(erro)
+
+  lider = threading.Thread(target=chamar, daemon=True)
+  lider.start()
+  while not chamadas:
+    pass
+  seguidor = threading.Thread(target=chamar, daemon=True)
+  seguidor.start()
+  liberar.set()
+  lider.join(5)
+  seguidor.join(5)
+  assert len(erros) == 2 and len(chamadas) == 1
+
+
+# Um rerun ou stop da sessão líder não interrompe quem espera: o seguidor calcula o resultado
+def test_excecao_de_controle_nao_chega_ao_seguidor():
+  liberar, chamadas = threading.Event(), []
+
+  @coalescencia.coalescido
+  def buscar():
+    chamadas.append(1)
+    if len(chamadas) == 1:
+      liberar.wait(5)
+      raise Controle()
+    return 'ok'
+
+  capturadas = []
+
+  def chamar_lider():
+    try:
+      buscar()
+    except Controle as erro:
+      capturadas.append(erro)
+
+  lider = threading.Thread(target=chamar_lider, daemon=True)
+  lider.start()
+  while not chamadas:
+    pass
+  seguidor, resultado = esperar_seguidor(buscar)
+  liberar.set()
+  lider.join(5)
+  seguidor.join(5)
+  assert len(capturadas) == 1
+  assert resultado == ['ok']
+  assert not coalescencia._em_andamento
+
+
+def test_excecao_de_controle_propagada_na_lider():
+  @coalescencia.coalescido
+  def buscar():
+    raise Controle()
+
+  with pytest.raises(Controle):
+    buscar()
+  assert not coalescencia._em_andamento
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import graficos
+
+
+def test_lttb_mantem_extremos_e_tamanho():
+  x = np.arange(1000, dtype='float64')
+  y = np.sin(x / 50)
+  y[500] = 10
+  indices = graficos.lttb(x, y, 100)
+  assert len(indices) == 100
+  assert indices[0] == 0 and indices[-1] == 999
+  assert (np.diff(indices) > 0).all()
+  assert 500 in indices
+
+
+def test_lttb_abaixo_do_limite_mantem_todos():
+  assert graficos.lttb(np.arange(10.0), np.arange(10.0), 10).tolist() == list(range(10))
+  assert graficos.lttb(np.arange(10.0), np.arange(10.0), 2).tolist() == list(range(10))
+
+
+def test_reduzir_serie_so_acima_do_limite_e_recorta_atributos():
+  datas = pd.date_range('2024-01-01', periods=50, freq='h')
+  no_limite = go.Scatter(x=datas[:20], y=np.arange(20.0), mode='lines')
+  graficos.reduzir_serie(no_limite, limite=20)
+  assert len(no_limite.x) == 20
+
+  acima = go.Scatter(x=datas, y=np.arange(50.0), text=[str(i) for i in range(50)], mode='lines')
+  graficos.reduzir_serie(acima, limite=20)
+  assert len(acima.x) == len(acima.y) == len(acima.text) == 20
+  assert acima.text[0] == '0' and acima.text[-1] == '49'
+
+  pontos = go.Scatter(x=datas, y=np.arange(50.0), mode='markers')
+  graficos.reduzir_serie(pontos, limite=20)
+  assert len(pontos.x) == 50
+
+
+def test_para_webgl_so_acima_do_limite():
+  pequena = go.Figure(go.Scatter(x=np.arange(5), y=np.arange(5)))
+  assert graficos.para_webgl(pequena, limite=5) is pequena
+  grande = graficos.para_webgl(go.Figure([go.Scatter(x=np.arange(6), y=np.arange(6)), go.Bar(x=[1], y=[1])]), limite=5)
+  assert [trace.type for trace in grande.data] == ['scattergl', 'bar']
+
+
+def test_compactar_datas_so_sem_horario():
+  diaria = go.Scatter(x=pd.date_range('2024-01-01', periods=3), y=[1, 2, 3])
+  graficos.compactar_datas(diaria)
+  assert list(diaria.x) == ['2024-01-01', '2024-01-02', '2024-01-03']
+  horaria = go.Scatter(x=pd.date_range('2024-01-01', periods=3, freq='h'), y=[1, 2, 3])
+  graficos.compactar_datas(horaria)
+  assert not isinstance(horaria.x[0], str)
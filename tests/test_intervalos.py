@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import intervalos
+
+
+def test_pares_janela_semiaberta():
+  instantes = pd.to_datetime(['2024-01-03', '2024-01-01', None, '2024-01-02', '2024-01-05'])
+  linhas, janelas = intervalos.pares(instantes, ['2024-01-01', '2024-01-02'], ['2024-01-03', '2024-01-06'])
+  # O início entra, o fim não, NaT nunca; o dia 2 cai nas duas janelas sobrepostas
+  assert sorted(zip(janelas.tolist(), linhas.tolist())) == [(0, 1), (0, 3), (1, 0), (1, 3), (1, 4)]
+
+
+def test_pares_janela_sem_data_ou_vazia():
+  linhas, janelas = intervalos.pares(['2024-01-01'], [None, '2024-01-02'], ['2024-01-05', '2024-01-01'])
+  assert len(linhas) == len(janelas) == 0
+
+
+def test_marcar_eventos_periodos_em_dias_inteiros():
+  eventos = pd.DataFrame({'evento': ['Carnaval'], 'data_inicial': [pd.Timestamp('2024-02-10')],
+                          'data_final': [pd.Timestamp('2024-02-12')]})
+  chamados = pd.DataFrame({'data_inicio': pd.to_datetime([
+    '2024-02-07 23:59', '2024-02-08 00:00', '2024-02-09 23:59', '2024-02-10 00:00',
+    '2024-02-12 23:59', '2024-02-13 00:00', '2024-02-13 23:59', '2024-02-14 00:00'])})
+  marcados = intervalos.marcar_eventos(chamados, eventos, 'data_inicio', dias_antes=2, dias_depois=1)
+  assert marcados['data_inicio'].tolist() == chamados['data_inicio'].iloc[1:7].tolist()
+  assert marcados['periodo'].astype(str).tolist() == ['Antes', 'Antes', 'Durante', 'Durante', 'Depois', 'Depois']
+  assert (marcados['evento'] == 'Carnaval').all()
+
+
+def test_resumo_eventos_inclui_eventos_sem_chamados():
+  eventos = pd.DataFrame({'evento': ['A', 'B'], 'data_inicial': pd.to_datetime(['2024-01-01', '2024-06-01']),
+                          'data_final': pd.to_datetime(['2024-01-02', '2024-06-01'])})
+  diarios = pd.DataFrame({'data': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03']), 'contagem': [4, 6, 5]})
+  resumo = intervalos.resumo_eventos(intervalos.marcar_eventos(diarios, eventos, dias_depois=1), eventos)
+  assert resumo[['Antes', 'Durante', 'Depois']].to_numpy().tolist() == [[0, 10, 5], [0, 0, 0]]
+  assert np.allclose(resumo['media_diaria_durante'], [5.0, 0.0])
@@ -0,0 +1,29 @@
+import threading
+
+import paralelo
+
+
+def test_carregar_em_paralelo_preserva_ordem():
+  assert paralelo.carregar_em_paralelo((lambda x: x * 2, 1), (lambda x: x * 2, 2)) == [2, 4]
+
+
+# Mais tarefas externas que threads no executor, cada uma esperando tarefas internas: sem a
+# execução em linha das tarefas internas, todas as threads ficariam presas esperando
+def test_carregar_em_paralelo_aninhado_nao_trava():
+  externas = paralelo.MAX_TRABALHADORES * 2
+  barreira = threading.Barrier(paralelo.MAX_TRABALHADORES, timeout=5)
+
+  def externa(i):
+    try:
+      barreira.wait()
+    except threading.BrokenBarrierError:
+      pass
+    return sum(paralelo.carregar_em_paralelo(*[(lambda j: i + j, j) for j in range(3)]))
+
+  resultado = []
+  thread = threading.Thread(target=lambda: resultado.extend(
+    paralelo.carregar_em_paralelo(*[(externa, i) for i in range(externas)])), daemon=True)
+  thread.start()
+  thread.join(timeout=30)
+  assert not thread.is_alive()
+  assert resultado == [3 * i + 3 for i in range(externas)]
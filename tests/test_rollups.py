@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import armazem
+import consultas
+import rollups
+
+
+# BigQuery de mentira sobre uma lista de chamados (data_inicio, tipo), com o filtro semiaberto das consultas
+class Fonte:
+  def __init__(self, chamados):
+    self.chamados = list(chamados)
+    self.consultas = []
+
+  def executar(self, sql, parametros):
+    inicio, fim = (valor for _, _, valor in parametros)
+    self.consultas.append((consultas.nome_modelo(sql), inicio.date(), fim.date()))
+    df = pd.DataFrame(self.chamados, columns=['data_inicio', 'tipo'])
+    df = df[(df['data_inicio'] >= inicio) & (df['data_inicio'] < fim)]
+    df['data'] = df['data_inicio'].dt.date
+    if consultas.nome_modelo(sql) == 'contagem_diaria':
+      return df.groupby('data', as_index=False).agg(contagem=('tipo', 'size'), ultimo_inicio=('data_inicio', 'max'))
+    df = df.assign(status='Aberto', hora=df['data_inicio'].dt.hour, id_bairro='1')
+    return df.groupby(['data', 'tipo', 'status', 'hora', 'id_bairro'], as_index=False).size().rename(columns={'size': 'contagem'})
+
+
+@pytest.fixture(autouse=True)
+def diretorios(tmp_path, monkeypatch):
+  monkeypatch.setattr(armazem, 'DIRETORIO_ARMAZEM', str(tmp_path / 'chamados_diarios'))
+  monkeypatch.setattr(rollups, 'DIRETORIO_ROLLUPS', str(tmp_path / 'rollups'))
+  monkeypatch.setattr(rollups, 'ARQUIVO_MARCA', str(tmp_path / 'rollups' / 'marca_dagua.json'))
+
+
+def dia(dias_atras, hora=10):
+  return pd.Timestamp(date.today() - timedelta(days=dias_atras)) + pd.Timedelta(hours=hora)
+
+
+def test_atualizar_reconstroi_so_os_dias_com_chamados_atrasados():
+  fonte = Fonte([(dia(5), 'A'), (dia(3), 'B'), (dia(3, 23), 'B')])
+  rollups.atualizar(fonte.executar, desde=date.today() - timedelta(days=12))
+  assert rollups.ler_marca()['data_inicio_max'] == dia(3, 23).isoformat()
+  assert rollups.carregar('dia_tipo_status', dia(12), dia(1), fonte.executar)['contagem'].sum() == 3
+
+  # Chamado atrasado: começou antes da marca d'água, mas só chegou depois do último refresh
+  fonte.chamados.append((dia(5, 8), 'A'))
+  fonte.consultas.clear()
+  assert rollups.atualizar(fonte.executar) == [dia(5).date()]
+  assert fonte.consultas[0] == ('contagem_diaria', dia(3).date() - timedelta(days=rollups.JANELA_ATRASO), date.today())
+  assert ('agregado_diario', dia(5).date(), dia(4).date()) in fonte.consultas
+  diario = rollups.carregar('dia_tipo_status', dia(12), dia(1), fonte.executar)
+  assert diario.groupby('data')['contagem'].sum().to_dict() == {dia(5, 0): 2, dia(3, 0): 2}
+
+
+def test_carregar_sem_refresh_materializa_e_reusa_o_mes():
+  fonte = Fonte([(dia(2), 'A')])
+  inicio = rollups.primeiro_dia_do_mes(date.today() - timedelta(days=2))
+  primeiro = rollups.carregar('dia_hora', inicio, dia(1), fonte.executar)
+  consultas_feitas = len(fonte.consultas)
+  segundo = rollups.carregar('dia_hora', inicio, dia(1), fonte.executar)
+  assert len(fonte.consultas) == consultas_feitas
+  pd.testing.assert_frame_equal(primeiro, segundo, check_dtype=False)
+  assert segundo['hora'].tolist() == [10]